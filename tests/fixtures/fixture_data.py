@@ -1,8 +1,21 @@
+import shutil
 import tempfile
 
 import pytest
 from mixer.backend.django import mixer as _mixer
 from posts.models import Post, Group
+from posts.thumbnails import wait_for_thumbnails
+
+
+@pytest.fixture(autouse=True)
+def temp_media_root(settings):
+    """ Загрузки и миниатюры тестов не попадают в настоящий MEDIA_ROOT. """
+    media_root = tempfile.mkdtemp()
+    settings.MEDIA_ROOT = media_root
+    yield media_root
+    # Фоновые миниатюры пишут в MEDIA_ROOT и после конца теста
+    wait_for_thumbnails()
+    shutil.rmtree(media_root, ignore_errors=True)
 
 
 @pytest.fixture()
@@ -0,0 +1,373 @@
+"""
+Кэш в два уровня и общий кэш в файле SQLite.
+
+TieredCache — кэш по умолчанию: перед общим кэшем (L2, один на все
+процессы: файлы, SQLite или Redis) стоит LRU в памяти процесса (L1).
+Ключи из LOCAL_SKIP (версии лент) всегда читаются из L2, поэтому
+сброс версии сразу виден всем процессам, а страницы и фрагменты,
+ключи которых содержат версии, не устаревают в L1.
+
+Горячие ключи (SINGLE_FLIGHT) защищены от лавины пересчетов:
+после промаха значение считает только взявший блокировку в L2,
+остальные ждут его результат или получают прежнее значение.
+Незадолго до конца срока жизни запись с вероятностью, растущей
+к концу срока и со временем пересчета, объявляется устаревшей
+для одного из читателей (XFetch), и он считает ее заранее.
+"""
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .kvstore import LRUCache
+
+
+LOCK_PREFIX = 'lock:'
+
+# Пауза между проверками ожидающего чужой пересчет, секунды
+POLL_INTERVAL = 0.05
+
+# Наибольшее число параметров в одном запросе IN (...)
+SQLITE_CHUNK = 500
+
+# Django создает экземпляр кэша в каждом потоке, а L1 должен быть
+# один на процесс: LRU общие по настройкам L2, как хранилища LocMemCache
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """
+    L1 в процессе перед общим L2. Параметры OPTIONS:
+    SHARED — настройки L2 как в CACHES, LOCAL_MAX_ENTRIES
+    и LOCAL_TIMEOUT — размер и время жизни L1, LOCAL_SKIP — префиксы
+    ключей мимо L1, SINGLE_FLIGHT — префиксы горячих ключей,
+    LOCK_TIMEOUT — наибольшее время пересчета, EARLY_EXPIRY_BETA —
+    насколько рано пересчитывать (0 — только после истечения).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        shared = options['SHARED']
+        self.shared = import_string(shared['BACKEND'])(
+            shared.get('LOCATION', ''), shared)
+        with _local_tiers_lock:
+            self.local = _local_tiers.setdefault(
+                (shared['BACKEND'], shared.get('LOCATION', '')),
+                LRUCache(options.get('LOCAL_MAX_ENTRIES', 1000),
+                         options.get('LOCAL_TIMEOUT', 60)))
+        self.local_skip = tuple(options.get('LOCAL_SKIP', ()))
+        self.single_flight = tuple(options.get('SINGLE_FLIGHT', ()))
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 5)
+        self.beta = options.get('EARLY_EXPIRY_BETA', 1.0)
+        self._thread = threading.local()
+
+    @property
+    def _pending(self):
+        """
+        Ключи, которые пересчитывает текущий поток:
+        ключ -> (начало пересчета, взята ли блокировка).
+        """
+        pending = getattr(self._thread, 'pending', None)
+        if pending is None:
+            pending = self._thread.pending = {}
+        return pending
+
+    def _seconds(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _envelope(self, key, value, timeout, version):
+        """ Значение со сроком и временем пересчета для XFetch. """
+        started, _ = self._pending.get(self.make_key(key, version),
+                                       (None, False))
+        delta = time.perf_counter() - started if started else 0
+        expires = None if timeout is None else time.time() + timeout
+        return (value, expires, delta)
+
+    def _local_key(self, key, version):
+        if key.startswith(self.local_skip):
+            return None
+        return self.make_key(key, version)
+
+    def _remember(self, local_key, envelope):
+        if local_key is not None:
+            self.local.set(local_key, pickle.dumps(envelope,
+                                                   pickle.HIGHEST_PROTOCOL))
+
+    def _get_envelope(self, key, version, local=True):
+        local_key = self._local_key(key, version)
+        if local and local_key is not None:
+            data = self.local.get(local_key)
+            if data is not None:
+                envelope = pickle.loads(data)
+                if envelope[1] is None or envelope[1] > time.time():
+                    return envelope
+                self.local.delete(local_key)
+        envelope = self.shared.get(key, version=version)
+        if envelope is not None:
+            self._remember(local_key, envelope)
+        return envelope
+
+    def _expires_early(self, envelope):
+        _, expires, delta = envelope
+        if expires is None or not delta:
+            return False
+        # 1 - random() лежит в (0, 1], логарифм не бывает бесконечным
+        early = -delta * self.beta * math.log(1 - random.random())
+        return time.time() + early >= expires
+
+    def _lock(self, key, version):
+        return self.shared.add(LOCK_PREFIX + key, 1, self.lock_timeout,
+                               version=version)
+
+    def _release(self, key, version):
+        _, locked = self._pending.pop(self.make_key(key, version),
+                                      (None, False))
+        if locked:
+            self.shared.delete(LOCK_PREFIX + key, version=version)
+
+    def _wait(self, key, version):
+        """ Ждет чужой пересчет; None — если не дождался. """
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            envelope = self._get_envelope(key, version, local=False)
+            if envelope is not None:
+                return envelope
+            if self.shared.get(LOCK_PREFIX + key, version=version) is None:
+                return None
+        return None
+
+    def get(self, key, default=None, version=None):
+        envelope = self._get_envelope(key, version)
+        if not key.startswith(self.single_flight):
+            return default if envelope is None else envelope[0]
+        if envelope is not None and not self._expires_early(envelope):
+            return envelope[0]
+        locked = self._lock(key, version)
+        if not locked:
+            if envelope is not None:
+                # Пересчитывает другой — отдаем прежнее значение
+                return envelope[0]
+            envelope = self._wait(key, version)
+            if envelope is not None:
+                return envelope[0]
+        self._pending[self.make_key(key, version)] = (time.perf_counter(),
+                                                      locked)
+        return default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._seconds(timeout)
+        if timeout is not None and timeout <= 0:
+            self.delete(key, version)
+            return
+        envelope = self._envelope(key, value, timeout, version)
+        self.shared.set(key, envelope, timeout, version=version)
+        self._remember(self._local_key(key, version), envelope)
+        self._release(key, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._seconds(timeout)
+        envelope = self._envelope(key, value, timeout, version)
+        added = self.shared.add(key, envelope, timeout, version=version)
+        if added:
+            self._remember(self._local_key(key, version), envelope)
+        self._release(key, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        envelope = self._get_envelope(key, version, local=False)
+        if envelope is None:
+            return False
+        self.set(key, envelope[0], timeout, version)
+        return True
+
+    def has_key(self, key, version=None):
+        return self._get_envelope(key, version) is not None
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self.local.delete(local_key)
+        self.shared.delete(key, version=version)
+        self._release(key, version)
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            local_key = self._local_key(key, version)
+            data = local_key and self.local.get(local_key)
+            envelope = data and pickle.loads(data)
+            if envelope and (envelope[1] is None
+                             or envelope[1] > time.time()):
+                found[key] = envelope[0]
+            else:
+                missing.append(key)
+        if missing:
+            for key, envelope in self.shared.get_many(
+                    missing, version=version).items():
+                self._remember(self._local_key(key, version), envelope)
+                found[key] = envelope[0]
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._seconds(timeout)
+        envelopes = {key: self._envelope(key, value, timeout, version)
+                     for key, value in data.items()}
+        failed = self.shared.set_many(envelopes, timeout, version=version)
+        for key, envelope in envelopes.items():
+            self._remember(self._local_key(key, version), envelope)
+            self._release(key, version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Общий кэш в отдельном файле SQLite (LOCATION) в режиме WAL:
+    один на все процессы сервера и без отдельного сервиса.
+    Лишние записи удаляются раз в CULL_EVERY записей.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self.cull_every = params.get('OPTIONS', {}).get('CULL_EVERY', 100)
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def connection(self):
+        # После fork соединение родителя использовать нельзя
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        connection = sqlite3.connect(self.path, timeout=5,
+                                     isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, '
+            'value BLOB NOT NULL, expires REAL) WITHOUT ROWID'
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def _written(self, count=1):
+        self._writes += count
+        if self._writes >= self.cull_every:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        connection = self.connection
+        connection.execute('DELETE FROM cache WHERE expires < ?',
+                           (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # Первыми уходят записи, которые и так скоро истекут
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,))
+
+    def get(self, key, default=None, version=None):
+        row = self.connection.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        found = {}
+        items = list(names)
+        for start in range(0, len(items), SQLITE_CHUNK):
+            chunk = items[start:start + SQLITE_CHUNK]
+            rows = self.connection.execute(
+                f'SELECT key, value FROM cache WHERE key IN '
+                f'({", ".join("?" * len(chunk))}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                (*chunk, time.time())
+            )
+            for name, value in rows:
+                found[names[name]] = pickle.loads(value)
+        return found
+
+    def _row(self, key, value, timeout, version):
+        return (self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self.get_backend_timeout(timeout))
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+            self._row(key, value, timeout, version))
+        self._written()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        connection = self.connection
+        rows = [self._row(key, value, timeout, version)
+                for key, value in data.items()]
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', rows)
+        self._written(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.connection.execute(
+            'INSERT INTO cache VALUES (?, ?, ?) ON CONFLICT(key) '
+            'DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires <= ?',
+            (*self._row(key, value, timeout, version), time.time()))
+        self._written()
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()))
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version) is not self
+
+    def delete(self, key, version=None):
+        self.connection.execute('DELETE FROM cache WHERE key = ?',
+                                (self._key(key, version),))
+
+    def delete_many(self, keys, version=None):
+        self.connection.executemany(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys])
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
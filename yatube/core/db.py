@@ -0,0 +1,89 @@
+"""
+Настройка соединений SQLite и отдельное соединение для чтения.
+
+При открытии каждого соединения выполняются PRAGMA из SQLITE_PRAGMAS:
+WAL позволяет читать во время записи, busy_timeout заставляет
+пишущих ждать блокировку, а не сразу падать с "database is locked".
+Соединение DATABASE_READ_ALIAS открывается с query_only: через него
+идут чтения представлений, помеченных read_only_view.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_reading = ContextVar('read_only_view', default=False)
+
+# PRAGMA, которые относятся к файлу базы, а не к соединению
+DATABASE_PRAGMAS = ('journal_mode',)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """ Обработчик connection_created. """
+    if connection.vendor != 'sqlite':
+        return
+    read_only = connection.alias == settings.DATABASE_READ_ALIAS
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            if read_only and name in DATABASE_PRAGMAS:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only = ON')
+
+
+def read_alias():
+    """ Псевдоним соединения для чтения или None, если оно выключено. """
+    alias = settings.DATABASE_READ_ALIAS
+    if not alias or alias not in settings.DATABASES:
+        return None
+    # Внутри транзакции чтения идут в нее же, иначе не видно своих записей.
+    # Базу в памяти (тестовое зеркало default) второе соединение
+    # видит без незакоммиченных данных, поэтому она тоже читается из default
+    read = connections[alias]
+    if (connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or read.vendor == 'sqlite' and read.is_in_memory_db()):
+        return None
+    return alias
+
+
+def read_only_view(view):
+    """ Чтения GET и HEAD запросов представления идут в соединение чтения. """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        token = _reading.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _reading.reset(token)
+    return wrapper
+
+
+class ReadConnectionRouter:
+    """
+    Чтения внутри read_only_view — в DATABASE_READ_ALIAS,
+    все записи — в default, даже для объектов, прочитанных оттуда.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _reading.get():
+            return read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, settings.DATABASE_READ_ALIAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == settings.DATABASE_READ_ALIAS:
+            return False
+        return None
@@ -0,0 +1,138 @@
+"""
+Хранилище метаданных миниатюр sorl-thumbnail в отдельном файле SQLite.
+
+Файл общий для всех процессов сервера и переживает их перезапуск,
+а перед ним в каждом процессе стоит небольшой LRU-кэш,
+поэтому повторные проверки миниатюр не ходят ни в базу, ни в хранилище.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+from .metrics import store
+
+
+class LRUCache:
+    """ Потокобезопасный LRU с ограниченным размером и временем жизни. """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteKVStore(KVStoreBase):
+    """
+    KV-хранилище sorl-thumbnail поверх SQLite в режиме WAL.
+    Подключается через THUMBNAIL_KVSTORE.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lru = LRUCache(settings.THUMBNAIL_KVSTORE_LRU_SIZE,
+                            settings.THUMBNAIL_KVSTORE_LRU_TIMEOUT)
+        self._path = None
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        # Путь читается при каждом обращении, чтобы его можно было
+        # подменить в тестах через override_settings
+        path = settings.THUMBNAIL_KVSTORE_PATH
+        if path != self._path:
+            self._path = path
+            self.lru.clear()
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.path != path:
+            connection.close()
+            connection = None
+        if connection is None:
+            connection = sqlite3.connect(path, timeout=5,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS thumbnail_kv '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID'
+            )
+            self._local.connection = connection
+            self._local.path = path
+        return connection
+
+    def _get_raw(self, key):
+        connection = self.connection
+        value = self.lru.get(key)
+        store.inc('yatube_cache_requests_total', cache='thumbnail_lru',
+                  result='miss' if value is None else 'hit')
+        if value is not None:
+            return value
+        row = connection.execute(
+            'SELECT value FROM thumbnail_kv WHERE key = ?', (key,)
+        ).fetchone()
+        store.inc('yatube_cache_requests_total', cache='thumbnail_kvstore',
+                  result='miss' if row is None else 'hit')
+        if row is None:
+            return None
+        self.lru.set(key, row[0])
+        return row[0]
+
+    def _set_raw(self, key, value):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO thumbnail_kv (key, value) VALUES (?, ?)',
+            (key, value)
+        )
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        self.lru.delete(*keys)
+        self.connection.executemany(
+            'DELETE FROM thumbnail_kv WHERE key = ?',
+            [(key,) for key in keys]
+        )
+
+    def _find_keys_raw(self, prefix):
+        escaped = (prefix.replace('\\', '\\\\')
+                   .replace('%', '\\%').replace('_', '\\_'))
+        rows = self.connection.execute(
+            "SELECT key FROM thumbnail_kv WHERE key LIKE ? ESCAPE '\\'",
+            (escaped + '%',)
+        )
+        return [row[0] for row in rows]
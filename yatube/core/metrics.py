@@ -0,0 +1,251 @@
+"""
+Метрики приложения в текстовом формате Prometheus.
+
+Каждый процесс копит счетчики в памяти и раз в METRICS_FLUSH_INTERVAL
+секунд атомарно переписывает свой файл METRICS_DIR/<pid>-<метка>.json.
+Метка случайна для каждого запуска, поэтому процесс, получивший pid
+завершившегося воркера, не подхватывает его еще не слитые счетчики.
+Между процессами нет блокировок: /metrics складывает файлы всех
+воркеров, поэтому сбор работает и под pre-fork сервером.
+Файлы завершившихся процессов при сборе (под блокировкой flock)
+прибавляются к METRICS_DIR/merged.json и удаляются, так что каталог
+не растет с перезапусками воркеров.
+"""
+import atexit
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+from django.conf import settings
+
+from .profiling import BUCKETS
+
+
+def _bound(bound):
+    """ Граница корзины в секундах, как ее пишет Prometheus. """
+    return '+Inf' if bound == float('inf') else f'{bound / 1000:g}'
+
+
+BOUNDS = [_bound(bound) for bound in BUCKETS]
+
+MERGED_FILE = 'merged.json'
+
+MERGE_LOCK_FILE = 'merge.lock'
+
+
+def _file_pid(name):
+    """ pid процесса из имени его файла или None для прочих файлов. """
+    if not name.endswith('.json'):
+        return None
+    pid = name[:-5].partition('-')[0]
+    return int(pid) if pid.isdigit() else None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsStore:
+    """ Счетчики процесса с периодическим сбросом в файл. """
+
+    def __init__(self):
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._token = None
+        self._flushed = 0.0
+
+    def _check_pid(self):
+        # После fork дочерний процесс начинает с пустых счетчиков
+        # и нового файла, даже если его pid уже был у другого процесса
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._token = uuid4().hex
+            self._values = defaultdict(float)
+
+    @property
+    def path(self):
+        return os.path.join(settings.METRICS_DIR,
+                            f'{self._pid}-{self._token}.json')
+
+    @staticmethod
+    def _load(path):
+        """ Счетчики из файла в формате _write. """
+        try:
+            with open(path) as file:
+                rows = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return {(name, tuple(map(tuple, labels))): value
+                for name, labels, value in rows}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_pid()
+            self._values[key] += value
+
+    def observe(self, name, seconds, **labels):
+        """ Наблюдение гистограммы с корзинами core.profiling.BUCKETS. """
+        # Корзины хранятся без накопления, суммируются при выводе
+        bound = next(bound for bound in BUCKETS if seconds * 1000 <= bound)
+        labels = tuple(sorted(labels.items()))
+        with self._lock:
+            self._check_pid()
+            self._values[(f'{name}_bucket',
+                          labels + (('le', _bound(bound)),))] += 1
+            self._values[(f'{name}_sum', labels)] += seconds
+            self._values[(f'{name}_count', labels)] += 1
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        with self._lock:
+            self._check_pid()
+            self._flushed = now
+            values = dict(self._values)
+        self._write(self.path, values)
+
+    @staticmethod
+    def _write(path, values):
+        """ Атомарно переписывает файл счетчиков. """
+        rows = [[name, labels, value]
+                for (name, labels), value in values.items()]
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=settings.METRICS_DIR,
+                                                 suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(rows, file)
+        os.replace(temp_path, path)
+
+    def merge_dead(self):
+        """
+        Переносит счетчики завершившихся процессов в MERGED_FILE
+        и удаляет их файлы. Возвращает число перенесенных файлов.
+        """
+        directory = settings.METRICS_DIR
+        with open(os.path.join(directory, MERGE_LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = [
+                os.path.join(directory, name)
+                for name in os.listdir(directory)
+                if _file_pid(name) is not None
+                and not _alive(_file_pid(name))
+            ]
+            if not dead:
+                return 0
+            merged_path = os.path.join(directory, MERGED_FILE)
+            merged = defaultdict(float, self._load(merged_path))
+            for path in dead:
+                for key, value in self._load(path).items():
+                    merged[key] += value
+            self._write(merged_path, merged)
+            for path in dead:
+                os.remove(path)
+        return len(dead)
+
+    def collect(self):
+        """ Сумма счетчиков всех процессов. """
+        self.flush(force=True)
+        self.merge_dead()
+        total = defaultdict(float)
+        for name in os.listdir(settings.METRICS_DIR):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(settings.METRICS_DIR, name)
+            for key, value in self._load(path).items():
+                total[key] += value
+        return total
+
+    def clear(self):
+        with self._lock:
+            self._check_pid()
+            self._values.clear()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+store = MetricsStore()
+atexit.register(lambda: store._pid and store.flush(force=True))
+
+
+HELP = {
+    'yatube_request_duration_seconds':
+        ('histogram', 'Время ответа по имени URL.'),
+    'yatube_db_queries_total':
+        ('counter', 'Запросы к базе по имени URL.'),
+    'yatube_db_query_seconds_total':
+        ('counter', 'Время запросов к базе по имени URL.'),
+    'yatube_cache_requests_total':
+        ('counter', 'Обращения к кэшам страниц, фрагментов и миниатюр.'),
+    'yatube_objects_created_total':
+        ('counter', 'Созданные посты, комментарии и подписки.'),
+}
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\')
+            .replace('"', '\\"').replace('\n', '\\n'))
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"'
+                          for name, value in labels) + '}'
+
+
+def render(values):
+    """ Текст в формате Prometheus из собранных счетчиков. """
+    families = defaultdict(list)
+    for (name, labels), value in values.items():
+        family = next((base for base in HELP if name.startswith(base)), name)
+        families[family].append((name, labels, value))
+    lines = []
+    for family in sorted(families):
+        kind, text = HELP.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {text}')
+        lines.append(f'# TYPE {family} {kind}')
+        rows = sorted(families[family])
+        buckets = defaultdict(lambda: [0] * len(BOUNDS))
+        for name, labels, value in rows:
+            if name.endswith('_bucket'):
+                plain = tuple(item for item in labels if item[0] != 'le')
+                buckets[plain][BOUNDS.index(dict(labels)['le'])] += value
+        for labels, counts in sorted(buckets.items()):
+            cumulative = 0
+            for bound, count in zip(BOUNDS, counts):
+                cumulative += count
+                lines.append(f'{family}_bucket'
+                             f'{_labels(labels + (("le", bound),))} '
+                             f'{cumulative:g}')
+        for name, labels, value in rows:
+            if not name.endswith('_bucket'):
+                lines.append(f'{name}{_labels(labels)} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def observe_request(view_name, stats, total):
+    store.observe('yatube_request_duration_seconds', total, view=view_name)
+    store.inc('yatube_db_queries_total', stats.db_count, view=view_name)
+    store.inc('yatube_db_query_seconds_total', stats.db_time,
+              view=view_name)
+    for (fragment, result), count in stats.fragments.items():
+        store.inc('yatube_cache_requests_total', count,
+                  cache=f'fragment:{fragment}', result=result)
+    store.flush()
@@ -0,0 +1,60 @@
+import cProfile
+import logging
+import os
+import random
+import time
+
+from django.conf import settings
+
+from .metrics import observe_request
+from .profiling import histogram, install_hooks, start_request
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """
+    Время запроса, число и время запросов к базе, время отрисовки
+    шаблонов и попадания в кэш по resolver_match.view_name.
+    Пишет заголовок Server-Timing, гистограмму в core.profiling
+    и счетчики Prometheus в core.metrics.
+    Доля PROFILING_SAMPLE_RATE запросов выполняется под cProfile,
+    дамп сохраняется, если запрос дольше PROFILING_SLOW_MS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_hooks()
+
+    def __call__(self, request):
+        sampled = (settings.PROFILING_SAMPLE_RATE > 0
+                   and random.random() < settings.PROFILING_SAMPLE_RATE)
+        profiler = cProfile.Profile() if sampled else None
+        with start_request() as stats:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        total = stats.elapsed
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        histogram.observe(view_name, stats, total)
+        observe_request(view_name, stats, total)
+        if settings.PROFILING_SERVER_TIMING:
+            response['Server-Timing'] = stats.server_timing(total)
+        if profiler is not None and total * 1000 >= settings.PROFILING_SLOW_MS:
+            self.dump(profiler, view_name, total)
+        return response
+
+    def dump(self, profiler, view_name, total):
+        directory = settings.PROFILING_DUMP_DIR
+        os.makedirs(directory, exist_ok=True)
+        name = (f'{view_name.replace(":", "-")}-{int(time.time() * 1000)}-'
+                f'{os.getpid()}-{int(total * 1000)}ms.prof')
+        path = os.path.join(directory, name)
+        profiler.dump_stats(path)
+        logger.info('Профиль медленного запроса %s: %s', view_name, path)
@@ -0,0 +1,146 @@
+"""
+Кэш страниц целиком.
+
+Общая для всех читателей часть страницы хранится в кэше по адресу
+и версии данных. Места, которые зависят от читателя, размечаются
+тегом {% user_fragment %}: в общую часть вместо них попадают метки,
+и для каждого запроса заново рендерятся только эти фрагменты.
+Ответ анонимному читателю собирается один раз и хранится целиком.
+Ключ строится из пути и только тех параметров запроса, которые
+читает представление, а вместе с телом хранятся заголовки ответа.
+"""
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+
+from .metrics import store
+
+
+FRAGMENTS_ATTR = '_user_fragments'
+MARKER = '<!--user-fragment:{}-->'
+PAGE_KEY = 'page:{}:{}'
+
+
+def mark_fragment(request, name, values, html):
+    """
+    Во время рендера общей части запоминает фрагмент и возвращает
+    метку вместо него, в остальное время — сам фрагмент.
+    Значения уходят в общий кэш, поэтому объекты моделей
+    не принимаются: фрагменту передаются pk и простые поля.
+    """
+    for key, value in values.items():
+        if isinstance(value, Model):
+            raise TypeError(
+                f'Фрагмент {name}: {key} — объект модели, '
+                f'передайте pk или поля')
+    fragments = getattr(request, FRAGMENTS_ATTR, None)
+    if fragments is None:
+        return html
+    fragments.append((name, values, html))
+    return MARKER.format(len(fragments) - 1)
+
+
+def fill_fragments(content, parts):
+    """ Подставляет HTML фрагментов parts на места меток. """
+    for i, html in enumerate(parts):
+        content = content.replace(MARKER.format(i), html, 1)
+    return content
+
+
+def _page_key(request, query):
+    """ Путь и параметры query запроса, остальные не влияют на ключ. """
+    params = [(name, value) for name in query
+              for value in request.GET.getlist(name)]
+    return f'{request.path}?{urlencode(params)}'
+
+
+def _response(content, headers):
+    """ Ответ из кэша с сохраненными заголовками. """
+    response = HttpResponse()
+    for name, value in headers:
+        response[name] = value
+    response.content = content
+    return response
+
+
+def _render_shared(view, request, args, kwargs, keys, timeout):
+    setattr(request, FRAGMENTS_ATTR, [])
+    try:
+        response = view(request, *args, **kwargs)
+    except Exception:
+        # Освобождает ключи для ждущих их запросов (core.cache)
+        cache.delete_many(list(keys.values()))
+        raise
+    finally:
+        fragments = request.__dict__.pop(FRAGMENTS_ATTR)
+    if response.streaming:
+        cache.delete_many(list(keys.values()))
+        return response
+    shared = response.content.decode(response.charset)
+    content = fill_fragments(shared, [html for _, _, html in fragments])
+    response.content = content
+    if response.status_code != 200:
+        cache.delete_many(list(keys.values()))
+        return response
+    headers = [(name, value) for name, value in response.items()
+               if name.lower() != 'content-length']
+    cache.set(keys['shared'],
+              (shared, [(name, values) for name, values, _ in fragments],
+               headers),
+              timeout)
+    if 'anonymous' in keys:
+        cache.set(keys['anonymous'], (content, headers), timeout)
+    return response
+
+
+def cache_shared_page(version, user_context=None, query=()):
+    """
+    Кэширует ответы GET представления по пути, параметрам
+    запроса из query и version(request, *args, **kwargs).
+    user_context(request, *args, **kwargs) дает фрагментам переменные,
+    которые зависят от читателя; остальные переменные фрагмент
+    получает из тега при рендере общей части.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            if not timeout or request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            page = md5(
+                f'{_page_key(request, query)}:'
+                f'{version(request, *args, **kwargs)}'.encode()
+            ).hexdigest()
+            keys = {'shared': PAGE_KEY.format('shared', page)}
+            if not request.user.is_authenticated:
+                keys['anonymous'] = PAGE_KEY.format('anonymous', page)
+                entry = cache.get(keys['anonymous'])
+                store.inc('yatube_cache_requests_total',
+                          cache='page:anonymous',
+                          result='miss' if entry is None else 'hit')
+                if entry is not None:
+                    return _response(*entry)
+            entry = cache.get(keys['shared'])
+            store.inc('yatube_cache_requests_total', cache='page:shared',
+                      result='miss' if entry is None else 'hit')
+            if entry is None:
+                return _render_shared(view, request, args, kwargs, keys,
+                                      timeout)
+            shared, fragments, headers = entry
+            extra = (user_context(request, *args, **kwargs)
+                     if user_context else {})
+            content = fill_fragments(shared, [
+                render_to_string(name, {**values, **extra}, request)
+                for name, values in fragments
+            ])
+            if 'anonymous' in keys:
+                cache.set(keys['anonymous'], (content, headers), timeout)
+            return _response(content, headers)
+        return wrapper
+    return decorator
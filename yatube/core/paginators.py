@@ -0,0 +1,59 @@
+"""
+Паджинатор для больших таблиц в админке.
+
+Полный COUNT(*) по таблице с миллионами строк занимает секунды,
+поэтому для списка без фильтров берется оценка числа строк
+из статистики базы, если она больше ADMIN_COUNT_ESTIMATE_THRESHOLD.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Примерное число строк таблицы модели queryset или None.
+    PostgreSQL: pg_class.reltuples, SQLite: sqlite_stat1 после ANALYZE,
+    иначе наибольший первичный ключ — поиск по индексу.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table]
+            )
+            row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table]
+                )
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+    return (model._default_manager.using(queryset.db)
+            .aggregate(max_pk=Max('pk'))['max_pk'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Точный COUNT(*) только для отфильтрованных или небольших списков. """
+
+    @cached_property
+    def count(self):
+        threshold = settings.ADMIN_COUNT_ESTIMATE_THRESHOLD
+        query = getattr(self.object_list, 'query', None)
+        if threshold is not None and query is not None and not query.where:
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,258 @@
+"""
+Учет времени запросов: база, шаблоны и кэш по каждому представлению.
+
+Хуки ставятся один раз на процесс и почти ничего не стоят,
+пока для текущего потока не начат учет через start_request().
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from django.core.cache import caches
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+
+# Границы корзин гистограммы в миллисекундах
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+# Префикс ключей тега {% cache %}: template.cache.<имя>.<хэш>
+FRAGMENT_PREFIX = 'template.cache.'
+
+_current = ContextVar('request_stats', default=None)
+_MISSING = object()
+_hooks_lock = threading.Lock()
+_hooked_caches = set()
+_template_hooked = False
+_installed = False
+
+
+class RequestStats:
+    """ Счетчики одного запроса. """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # (имя фрагмента {% cache %}, 'hit' или 'miss') -> число
+        self.fragments = Counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        """ Значение заголовка Server-Timing, длительности в мс. """
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def current_stats():
+    return _current.get()
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.db_count += 1
+            stats.db_time += time.perf_counter() - started
+
+
+def _hook_template():
+    global _template_hooked
+    original = Template.render
+
+    def render(self, context):
+        stats = _current.get()
+        if stats is None:
+            return original(self, context)
+        # Вложенные шаблоны ({% include %}, {% extends %})
+        # уже входят во время внешнего
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+
+    Template.render = render
+    _template_hooked = True
+
+
+def _hook_cache_class(cls):
+    original_get = cls.get
+    original_get_many = cls.get_many
+
+    def get(self, key, default=None, version=None):
+        value = original_get(self, key, _MISSING, version)
+        stats = _current.get()
+        if stats is not None:
+            hit = value is not _MISSING
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+            if key.startswith(FRAGMENT_PREFIX):
+                fragment = key[len(FRAGMENT_PREFIX):].split('.')[0]
+                stats.fragments[fragment, 'hit' if hit else 'miss'] += 1
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # BaseCache.get_many вызывает get для каждого ключа:
+        # на время вызова учет отключается, чтобы не считать дважды
+        token = _current.set(None)
+        try:
+            found = original_get_many(self, keys, version)
+        finally:
+            _current.reset(token)
+        stats = _current.get()
+        if stats is not None:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
+
+    cls.get = get
+    cls.get_many = get_many
+
+
+def install_hooks():
+    """ Подключает учет шаблонов и всех настроенных кэшей. """
+    global _installed
+    with _hooks_lock:
+        if not _template_hooked:
+            _hook_template()
+        for alias in settings.CACHES:
+            cls = type(caches[alias])
+            if cls not in _hooked_caches:
+                _hook_cache_class(cls)
+                _hooked_caches.add(cls)
+        _installed = True
+
+
+class _Tracking:
+    """ Контекст учета запроса: счетчики и обертки соединений с базой. """
+
+    def __init__(self):
+        self.stats = RequestStats()
+        self._wrappers = []
+
+    def __enter__(self):
+        self._token = _current.set(self.stats)
+        for connection in connections.all():
+            wrapper = connection.execute_wrapper(_db_wrapper)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        for wrapper in reversed(self._wrappers):
+            wrapper.__exit__(*exc_info)
+        _current.reset(self._token)
+
+
+def start_request():
+    """ with start_request() as stats: ... """
+    if not _installed:
+        install_hooks()
+    return _Tracking()
+
+
+class RollingHistogram:
+    """
+    Гистограмма длительностей по представлениям за последние
+    window секунд. Окно разбито на слоты по slot секунд,
+    устаревшие слоты выбрасываются при записи.
+    """
+
+    def __init__(self, window=600, slot=60):
+        self.window = window
+        self.slot = slot
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, now_slot):
+        oldest = now_slot - self.window // self.slot
+        for slot in [slot for slot in self._slots if slot <= oldest]:
+            del self._slots[slot]
+
+    def observe(self, view_name, stats, total, now=None):
+        now_slot = int((time.time() if now is None else now) // self.slot)
+        with self._lock:
+            self._expire(now_slot)
+            views = self._slots.setdefault(now_slot, {})
+            row = views.get(view_name)
+            if row is None:
+                row = views[view_name] = {
+                    'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0,
+                    'db_count': 0, 'db_time': 0.0, 'template_time': 0.0,
+                    'cache_hits': 0, 'cache_misses': 0,
+                }
+            row['buckets'][bisect_left(BUCKETS, total * 1000)] += 1
+            row['count'] += 1
+            row['sum'] += total
+            row['db_count'] += stats.db_count
+            row['db_time'] += stats.db_time
+            row['template_time'] += stats.template_time
+            row['cache_hits'] += stats.cache_hits
+            row['cache_misses'] += stats.cache_misses
+
+    def snapshot(self, now=None):
+        """ Суммы по представлениям за окно и перцентили p50/p95/p99. """
+        now_slot = int((time.time() if now is None else now) // self.slot)
+        result = {}
+        with self._lock:
+            self._expire(now_slot)
+            for views in self._slots.values():
+                for view_name, row in views.items():
+                    total = result.setdefault(view_name, {
+                        key: ([0] * len(BUCKETS) if key == 'buckets' else 0)
+                        for key in row
+                    })
+                    for key, value in row.items():
+                        if key == 'buckets':
+                            total[key] = [a + b for a, b
+                                          in zip(total[key], value)]
+                        else:
+                            total[key] += value
+        for row in result.values():
+            for percentile in (50, 95, 99):
+                row[f'p{percentile}'] = _percentile(row, percentile)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+
+
+def _percentile(row, percentile):
+    """ Верхняя граница корзины, в которую попадает перцентиль, мс. """
+    rank = row['count'] * percentile / 100
+    seen = 0
+    for bound, count in zip(BUCKETS, row['buckets']):
+        seen += count
+        if count and seen >= rank:
+            return bound
+    return 0
+
+
+histogram = RollingHistogram(settings.PROFILING_WINDOW,
+                             settings.PROFILING_SLOT)
@@ -0,0 +1,46 @@
+"""
+Прогрев шаблонов: все шаблоны проекта разбираются при старте процесса.
+С cached.Loader первые запросы не тратят время на разбор,
+а ошибка синтаксиса в любом шаблоне видна сразу, а не на той
+странице, которая ее использует.
+"""
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.template import engines
+
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def project_template_dirs(engine):
+    """ DIRS движка и каталоги templates приложений проекта. """
+    dirs = list(engine.dirs)
+    for app_config in apps.get_app_configs():
+        path = os.path.join(app_config.path, 'templates')
+        if app_config.path.startswith(settings.BASE_DIR) \
+                and os.path.isdir(path):
+            dirs.append(path)
+    return dirs
+
+
+def project_template_names(engine):
+    names = set()
+    for directory in project_template_dirs(engine):
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(TEMPLATE_EXTENSIONS):
+                    path = os.path.relpath(os.path.join(root, name),
+                                           directory)
+                    names.add(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_templates(using='django'):
+    """ Загружает все шаблоны проекта и возвращает их число. """
+    engine = engines[using].engine
+    names = project_template_names(engine)
+    for name in names:
+        engine.get_template(name)
+    return len(names)
@@ -0,0 +1,43 @@
+from django import template
+from django.template.base import token_kwargs
+
+from core.pagecache import mark_fragment
+
+
+register = template.Library()
+
+
+class UserFragmentNode(template.Node):
+    def __init__(self, template_name, extra):
+        self.template_name = template_name
+        self.extra = extra
+
+    def render(self, context):
+        name = self.template_name.resolve(context)
+        values = {
+            key: value.resolve(context) for key, value in self.extra.items()
+        }
+        fragment = context.template.engine.get_template(name)
+        with context.push(**values):
+            html = fragment.render(context)
+        return mark_fragment(context.get('request'), name, values, html)
+
+
+@register.tag
+def user_fragment(parser, token):
+    """
+    {% user_fragment 'шаблон.html' имя=значение %} — как include,
+    но в кэше страницы (core.pagecache) на месте фрагмента остается
+    метка, а сам он рендерится для каждого читателя.
+    Значения попадают в общий кэш, поэтому это pk и простые поля,
+    а не объекты моделей.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя шаблона')
+    extra = token_kwargs(bits[2:], parser)
+    if len(extra) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает только аргументы имя=значение')
+    return UserFragmentNode(parser.compile_filter(bits[1]), extra)
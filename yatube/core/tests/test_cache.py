@@ -0,0 +1,127 @@
+import os
+import tempfile
+import shutil
+import threading
+import time
+from django.test import SimpleTestCase
+from ..cache import LOCK_PREFIX, SQLiteCache, TieredCache
+
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+
+def sqlite_cache(name, **options):
+    return SQLiteCache(os.path.join(TEMP_DIR, name),
+                       {'OPTIONS': options})
+
+
+def tiered_cache(name, **options):
+    shared = {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(TEMP_DIR, name),
+    }
+    return TieredCache('', {'OPTIONS': {
+        'SHARED': shared,
+        'LOCAL_SKIP': ('version:',),
+        'SINGLE_FLIGHT': ('hot:',),
+        'LOCK_TIMEOUT': 2,
+        **options,
+    }})
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def test_values_are_shared_between_instances(self):
+        """ Проверка, что значения видны другому экземпляру (процессу). """
+        sqlite_cache('shared.sqlite3').set('key', {'a': 1})
+        other = sqlite_cache('shared.sqlite3')
+        self.assertEqual(other.get('key'), {'a': 1})
+        self.assertEqual(other.get_many(['key', 'missing']),
+                         {'key': {'a': 1}})
+
+    def test_expired_values_are_missing(self):
+        cache = sqlite_cache('expire.sqlite3')
+        cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(cache.get('key'))
+        self.assertTrue(cache.add('key', 'new'))
+        self.assertFalse(cache.add('key', 'newer'))
+        self.assertEqual(cache.get('key'), 'new')
+
+    def test_cull_keeps_max_entries(self):
+        """ Проверка, что лишние записи удаляются, первыми — истекающие. """
+        cache = sqlite_cache('cull.sqlite3', MAX_ENTRIES=10,
+                             CULL_FREQUENCY=2, CULL_EVERY=1)
+        cache.set('forever', 1, timeout=None)
+        cache.set_many({f'key{i}': i for i in range(15)})
+        self.assertLessEqual(len(cache.get_many(
+            [f'key{i}' for i in range(15)])), 10)
+        self.assertEqual(cache.get('forever'), 1)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def test_local_tier_serves_repeated_reads(self):
+        """ Повторное чтение идет из L1, версии — всегда из L2. """
+        cache = tiered_cache('tiered.sqlite3')
+        cache.set('page', 'html')
+        cache.set('version:index', 'v1')
+        cache.shared.clear()
+        self.assertEqual(cache.get('page'), 'html')
+        self.assertIsNone(cache.get('version:index'))
+        self.assertEqual(cache.get_many(['page', 'version:index']),
+                         {'page': 'html'})
+
+    def test_local_tier_is_shared_by_threads(self):
+        """ L1 один на процесс, хотя Django создает кэш в каждом потоке. """
+        tiered_cache('threads.sqlite3').set('page', 'html')
+        other = tiered_cache('threads.sqlite3')
+        other.shared.clear()
+        self.assertEqual(other.get('page'), 'html')
+
+    def test_single_flight(self):
+        """ После промаха горячего ключа значение считает один поток. """
+        cache = tiered_cache('flight.sqlite3')
+        computed = []
+        results = []
+
+        def reader():
+            value = cache.get('hot:index')
+            if value is None:
+                computed.append(1)
+                time.sleep(0.2)
+                value = 'html'
+                cache.set('hot:index', value)
+            results.append(value)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(computed), 1)
+        self.assertEqual(results, ['html'] * 4)
+        self.assertIsNone(cache.shared.get(LOCK_PREFIX + 'hot:index'))
+
+    def test_early_expiry_recomputes_once(self):
+        """
+        Досрочно пересчитывает один читатель,
+        остальные получают прежнее значение.
+        """
+        cache = tiered_cache('early.sqlite3', EARLY_EXPIRY_BETA=1e6)
+        self.assertIsNone(cache.get('hot:index'))
+        time.sleep(0.01)
+        cache.set('hot:index', 'old', timeout=60)
+        self.assertIsNone(cache.get('hot:index'))
+        other = tiered_cache('early.sqlite3', EARLY_EXPIRY_BETA=1e6)
+        self.assertEqual(other.get('hot:index'), 'old')
+
+    def test_delete_releases_lock(self):
+        """ Отказ от пересчета (delete) не заставляет других ждать. """
+        cache = tiered_cache('abandoned.sqlite3')
+        self.assertIsNone(cache.get('hot:index'))
+        cache.delete('hot:index')
+        started = time.monotonic()
+        self.assertIsNone(cache.get('hot:index'))
+        self.assertLess(time.monotonic() - started, 1)
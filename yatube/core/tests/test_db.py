@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase,
+                         TransactionTestCase)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..db import ReadConnectionRouter, read_only_view
+
+
+User = get_user_model()
+
+
+class SqlitePragmaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def open(self, alias):
+        settings_dict = dict(connections['default'].settings_dict,
+                             NAME=self.path)
+        wrapper = DatabaseWrapper(settings_dict, alias)
+        self.addCleanup(wrapper.close)
+        return wrapper.cursor()
+
+    def pragma(self, cursor, name):
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        """ Проверка PRAGMA нового соединения и соединения для чтения. """
+        cursor = self.open('default')
+        self.assertEqual(self.pragma(cursor, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(cursor, 'synchronous'), 1)
+        self.assertEqual(self.pragma(cursor, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(cursor, 'query_only'), 0)
+        cursor.execute('CREATE TABLE t (id integer)')
+        read = self.open('read')
+        self.assertEqual(self.pragma(read, 'query_only'), 1)
+        with self.assertRaisesMessage(Exception, 'readonly'):
+            read.execute('INSERT INTO t VALUES (1)')
+
+
+class ReadConnectionRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadConnectionRouter()
+        self.factory = RequestFactory()
+        # В тестах соединение для чтения — зеркало базы в памяти
+        patcher = mock.patch.object(connections['read'], 'is_in_memory_db',
+                                    return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, method):
+        seen = []
+
+        @read_only_view
+        def view(request):
+            seen.append(self.router.db_for_read(User))
+            return HttpResponse()
+
+        view(getattr(self.factory, method)('/'))
+        return seen[0]
+
+    def test_reads_of_read_only_views(self):
+        """ Проверка, что в соединение чтения идут только GET и HEAD. """
+        self.assertEqual(self.route('get'), 'read')
+        self.assertEqual(self.route('head'), 'read')
+        self.assertIsNone(self.route('post'))
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_writes_and_migrations_go_to_default(self):
+        """ Проверка записей, связей и миграций. """
+        user = User(username='reader')
+        user._state.db = 'read'
+        self.assertEqual(self.router.db_for_write(User, instance=user),
+                         'default')
+        author = User(username='author')
+        author._state.db = 'default'
+        self.assertTrue(self.router.allow_relation(user, author))
+        self.assertFalse(self.router.allow_migrate('read', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+class ReadConnectionRoutingTests(TransactionTestCase):
+    """
+    Маршрутизация на настоящем файле SQLite: тестовое зеркало в памяти
+    read_alias() не использует, поэтому оба соединения на время тестов
+    переключаются на временный файл.
+    """
+    databases = {'default', 'read'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'db.sqlite3')
+        # Соединения с базой в памяти не закрываются: иначе она пропадет
+        cls.memory_connections = {
+            alias: connections[alias] for alias in ('default', 'read')}
+        for alias, connection in cls.memory_connections.items():
+            connections[alias] = DatabaseWrapper(
+                dict(connection.settings_dict, NAME=path), alias)
+        call_command('migrate', verbosity=0, interactive=False)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias, connection in cls.memory_connections.items():
+            connections[alias].close()
+            connections[alias] = connection
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author,
+                                        text='Тестовый пост')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def capture(self, request):
+        """ Запросы соединений default и read во время request(). """
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['read']) as read:
+            request()
+        return default.captured_queries, read.captured_queries
+
+    def selects(self, queries, table):
+        return [query for query in queries
+                if query['sql'].startswith('SELECT') and table in query['sql']]
+
+    def test_get_reads_go_to_read(self):
+        """ Посты страниц GET-запросов читаются через соединение read. """
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                default, read = self.capture(lambda: self.client.get(url))
+                self.assertTrue(self.selects(read, 'posts_post'))
+                self.assertFalse(self.selects(default, 'posts_post'))
+
+    def test_writes_and_atomic_reads_go_to_default(self):
+        """ Записи POST и чтения внутри транзакции идут в default. """
+        default, read = self.capture(lambda: self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}))
+        self.assertTrue(
+            [query for query in default
+             if query['sql'].startswith('INSERT INTO "posts_post"')])
+        self.assertFalse(read)
+        self.assertTrue(Post.objects.filter(text='Новый пост').exists())
+
+        def atomic_get():
+            with transaction.atomic():
+                self.client.get(reverse('posts:index'))
+
+        default, read = self.capture(atomic_get)
+        self.assertTrue(self.selects(default, 'posts_post'))
+        self.assertFalse(read)
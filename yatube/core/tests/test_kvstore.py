@@ -0,0 +1,46 @@
+import os
+import tempfile
+import shutil
+from django.test import SimpleTestCase, override_settings
+from ..kvstore import LRUCache, SQLiteKVStore
+
+
+TEMP_DIR = tempfile.mkdtemp()
+KVSTORE_PATH = os.path.join(TEMP_DIR, 'kvstore.sqlite3')
+
+
+@override_settings(THUMBNAIL_KVSTORE_PATH=KVSTORE_PATH)
+class SQLiteKVStoreTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_lru_is_bounded(self):
+        """ Проверка, что LRU вытесняет самые старые ключи. """
+        lru = LRUCache(maxsize=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(len(lru), 2)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+
+    def test_lru_entries_expire(self):
+        """ Проверка, что записи LRU устаревают. """
+        lru = LRUCache(maxsize=2, timeout=-1)
+        lru.set('a', 1)
+        self.assertIsNone(lru.get('a'))
+
+    def test_values_are_shared_between_stores(self):
+        """ Проверка, что значения видны другому экземпляру (процессу). """
+        SQLiteKVStore()._set_raw('sorl-thumbnail||image||key', 'value')
+        other = SQLiteKVStore()
+        self.assertEqual(other._get_raw('sorl-thumbnail||image||key'),
+                         'value')
+        self.assertEqual(other._find_keys_raw('sorl-thumbnail||image'),
+                         ['sorl-thumbnail||image||key'])
+        other._delete_raw('sorl-thumbnail||image||key')
+        self.assertIsNone(
+            SQLiteKVStore()._get_raw('sorl-thumbnail||image||key'))
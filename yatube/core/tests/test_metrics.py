@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import shutil
+import subprocess
+import sys
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from posts.models import Post
+from ..metrics import MetricsStore, store
+
+
+User = get_user_model()
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR)
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+        store.clear()
+        for name in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, name))
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_request_histogram(self):
+        """ Проверка гистограммы времени ответа по имени URL. """
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        lines = self.metrics()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      lines)
+        self.assertIn('yatube_request_duration_seconds_bucket'
+                      '{view="posts:index",le="+Inf"} 2', lines)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"} 2', lines)
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_fragment_cache_ratio(self):
+        """ Проверка счетчиков кэша фрагментов главной страницы. """
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        lines = self.metrics()
+        for result in ('hit', 'miss'):
+            self.assertIn('yatube_cache_requests_total'
+                          f'{{cache="fragment:index_page",result="{result}"}}'
+                          ' 1', lines)
+
+    def test_page_cache_ratio(self):
+        """ Проверка счетчиков кэша страниц для анонима. """
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        lines = self.metrics()
+        for name, result in (('anonymous', 'hit'), ('anonymous', 'miss'),
+                             ('shared', 'miss')):
+            self.assertIn('yatube_cache_requests_total'
+                          f'{{cache="page:{name}",result="{result}"}}'
+                          ' 1', lines)
+
+    def test_created_objects(self):
+        """ Проверка счетчика созданных постов. """
+        user = User.objects.create_user(username='testboy')
+        Post.objects.create(author=user, text='Тестовый пост')
+        self.assertIn('yatube_objects_created_total{model="post"} 1',
+                      self.metrics())
+
+    def test_processes_are_summed(self):
+        """ Проверка, что файлы других процессов складываются. """
+        store.inc('yatube_objects_created_total', model='follow')
+        with open(os.path.join(METRICS_DIR, '1.json'), 'w') as file:
+            json.dump([['yatube_objects_created_total',
+                        [['model', 'follow']], 2]], file)
+        self.assertIn('yatube_objects_created_total{model="follow"} 3',
+                      self.metrics())
+
+    def test_dead_processes_are_merged(self):
+        """ Проверка, что файлы завершившихся процессов сливаются. """
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        dead_path = os.path.join(METRICS_DIR, f'{process.pid}.json')
+        with open(dead_path, 'w') as file:
+            json.dump([['yatube_objects_created_total',
+                        [['model', 'follow']], 2]], file)
+        for _ in range(2):
+            self.assertIn('yatube_objects_created_total{model="follow"} 2',
+                          self.metrics())
+        self.assertFalse(os.path.exists(dead_path))
+        self.assertTrue(os.path.exists(
+            os.path.join(METRICS_DIR, 'merged.json')))
+
+    def test_reused_pid_starts_empty(self):
+        """
+        Проверка, что процесс с pid завершившегося воркера
+        не подхватывает его счетчики и они не считаются дважды.
+        """
+        dead = MetricsStore()
+        dead.inc('yatube_objects_created_total', 2, model='follow')
+        dead.flush(force=True)
+        reused = MetricsStore()
+        reused.inc('yatube_objects_created_total', model='follow')
+        reused.flush(force=True)
+        self.assertEqual(
+            MetricsStore._load(reused.path),
+            {('yatube_objects_created_total', (('model', 'follow'),)): 1})
+        self.assertIn('yatube_objects_created_total{model="follow"} 3',
+                      self.metrics())
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_are_private(self):
+        """ Проверка, что /metrics закрыт для чужих адресов. """
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,40 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from ..paginators import EstimatedCountPaginator, estimate_count
+
+
+User = get_user_model()
+
+
+@override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=2)
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            User.objects.create_user(username=f'user{i}')
+        User.objects.filter(username='user1').delete()
+
+    def test_estimate_uses_max_pk(self):
+        """ Без статистики оценка — наибольший первичный ключ. """
+        users = User.objects.all()
+        self.assertEqual(estimate_count(users), users.last().pk)
+
+    def test_estimate_uses_sqlite_stat(self):
+        """ После ANALYZE оценка берется из sqlite_stat1. """
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimate_count(User.objects.all()), 2)
+
+    def test_filtered_list_is_counted(self):
+        """ Отфильтрованный список считается точно. """
+        users = User.objects.filter(username__startswith='user')
+        paginator = EstimatedCountPaginator(users.order_by('pk'), 10)
+        self.assertEqual(paginator.count, 2)
+        paginator = EstimatedCountPaginator(User.objects.order_by('pk'), 10)
+        self.assertEqual(paginator.count, User.objects.last().pk)
+
+    @override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=None)
+    def test_estimation_can_be_disabled(self):
+        paginator = EstimatedCountPaginator(User.objects.order_by('pk'), 10)
+        self.assertEqual(paginator.count, 2)
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import shutil
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from ..profiling import RollingHistogram, histogram, start_request
+
+
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(PROFILING_SERVER_TIMING=True)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+        histogram.clear()
+
+    def test_server_timing_header(self):
+        """ Проверка заголовка Server-Timing. """
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, timing)
+
+    def test_histogram_by_view_name(self):
+        """ Проверка, что запросы попадают в гистограмму представления. """
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        row = histogram.snapshot()['posts:index']
+        self.assertEqual(row['count'], 2)
+        self.assertEqual(sum(row['buckets']), 2)
+        self.assertGreater(row['db_count'], 0)
+        self.assertGreater(row['template_time'], 0)
+        # Первая отрисовка кладет фрагмент ленты в кэш, вторая берет его
+        self.assertGreater(row['cache_hits'], 0)
+        self.assertGreater(row['cache_misses'], 0)
+
+    def test_cache_calls_are_counted_once(self):
+        """ Проверка, что get_many не считается дважды. """
+        cache.set('a', 1)
+        with start_request() as stats:
+            cache.get('a')
+            cache.get('b')
+            cache.get_many(['a', 'b'])
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 2))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_MS=0,
+                       PROFILING_DUMP_DIR=PROFILE_DIR)
+    def test_slow_request_profile_is_saved(self):
+        """ Проверка, что медленный запрос сохраняет дамп cProfile. """
+        self.client.get(reverse('posts:index'))
+        dumps = os.listdir(PROFILE_DIR)
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].startswith('posts-index-'))
+
+
+class RollingHistogramTests(TestCase):
+    def test_old_slots_expire(self):
+        """ Проверка, что записи старше окна выбрасываются. """
+        rolling = RollingHistogram(window=120, slot=60)
+        with start_request() as stats:
+            pass
+        rolling.observe('view', stats, 0.003, now=0)
+        rolling.observe('view', stats, 0.2, now=61)
+        self.assertEqual(rolling.snapshot(now=61)['view']['count'], 2)
+        self.assertEqual(rolling.snapshot(now=61)['view']['p50'], 5)
+        self.assertEqual(rolling.snapshot(now=61)['view']['p99'], 250)
+        self.assertEqual(rolling.snapshot(now=125)['view']['count'], 1)
+        self.assertEqual(rolling.snapshot(now=200), {})
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+from ..templates import project_template_names, warm_templates
+
+
+CACHED_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [('django.template.loaders.cached.Loader',
+                     settings.TEMPLATE_LOADERS)],
+    },
+}]
+
+
+@override_settings(TEMPLATES=CACHED_TEMPLATES)
+class WarmTemplatesTests(SimpleTestCase):
+    def test_project_templates_are_found(self):
+        """ Шаблоны приложений и DIRS, без шаблонов сторонних пакетов. """
+        names = project_template_names(engines['django'].engine)
+        self.assertIn('posts/index.html', names)
+        self.assertIn('posts/includes/follow_button.html', names)
+        self.assertNotIn('admin/base.html', names)
+
+    def test_warm_fills_cached_loader(self):
+        """ После прогрева шаблоны берутся из памяти cached.Loader. """
+        engine = engines['django'].engine
+        loader = engine.template_loaders[0]
+        loader.reset()
+        count = warm_templates()
+        self.assertEqual(count,
+                         len(project_template_names(engine)))
+        self.assertIn('posts/index.html', loader.get_template_cache)
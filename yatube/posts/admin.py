@@ -1,5 +1,49 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from core.paginators import EstimatedCountPaginator
+from . import moderation
 from .models import Post, Group, Comment
+from .search import matching_post_ids
+
+
+class RegroupActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        empty_label='без группы'
+    )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Список для таблиц с миллионами строк: примерный COUNT(*),
+    без второго подсчета всех строк при фильтрации.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_actions(self, request):
+        # Стандартное удаление проходит Collector'ом по каждому объекту,
+        # вместо него используется пакетное
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def purge_authors(self, request, queryset):
+        user_ids = set(queryset.values_list('author_id', flat=True))
+        result = moderation.purge_authors(user_ids)
+        self.message_user(
+            request,
+            f'Отключено авторов: {result["users"]}, удалено постов: '
+            f'{result["posts"]}, комментариев: {result["comments"]}',
+            messages.SUCCESS
+        )
+    purge_authors.short_description = 'Удалить все записи авторов'
+    purge_authors.allowed_permissions = ('delete',)
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -10,19 +54,68 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk',
                     'text',
                     'pub_date',
                     'author',
                     'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    action_form = RegroupActionForm
+    actions = ('delete_posts', 'regroup_posts', 'purge_authors')
+
+    def delete_posts(self, request, queryset):
+        deleted = moderation.delete_posts(queryset)
+        self.message_user(request, f'Удалено постов: {deleted}',
+                          messages.SUCCESS)
+    delete_posts.short_description = 'Удалить выбранные посты'
+    delete_posts.allowed_permissions = ('delete',)
+
+    def regroup_posts(self, request, queryset):
+        # Выбор действия форма уже проверила, осталось поле группы
+        try:
+            group = RegroupActionForm.base_fields['group'].clean(
+                request.POST.get('group'))
+        except ValidationError:
+            self.message_user(request, 'Выберите существующую группу',
+                              messages.ERROR)
+            return
+        moved = moderation.regroup_posts(queryset, group)
+        self.message_user(
+            request,
+            f'Перенесено постов: {moved} в группу {group or "без группы"}',
+            messages.SUCCESS
+        )
+    regroup_posts.short_description = 'Перенести выбранные посты в группу'
+    regroup_posts.allowed_permissions = ('change',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Текст ищется по поисковому индексу, а не через LIKE '%q%',
+        # причем по всему индексу: число найденных постов не обрезается
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(
+            Q(pk__in=matching_post_ids(search_term))
+            | Q(author__username=search_term)
+        ), False
 
-class CommentAdmin(admin.ModelAdmin):
+    def get_changelist_formset(self, request, **kwargs):
+        formset = super().get_changelist_formset(request, **kwargs)
+        # Группы выбираются одним запросом на всю страницу,
+        # а не отдельным запросом в каждой строке
+        field = formset.form.base_fields['group']
+        field.choices = list(iter(field.choices))
+        return formset
+
+
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -31,9 +124,20 @@ class CommentAdmin(admin.ModelAdmin):
         'post'
     )
     list_editable = ('text',)
-    search_fields = ('author',)
-    list_filter = ('created', 'author')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    search_fields = ('=author__username',)
+    list_filter = ('created',)
+    date_hierarchy = 'created'
     empty_value_display = '-пусто-'
+    actions = ('delete_comments', 'purge_authors')
+
+    def delete_comments(self, request, queryset):
+        deleted = moderation.delete_comments(queryset)
+        self.message_user(request, f'Удалено комментариев: {deleted}',
+                          messages.SUCCESS)
+    delete_comments.short_description = 'Удалить выбранные комментарии'
+    delete_comments.allowed_permissions = ('delete',)
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,395 @@
+"""
+Замеры времени ответа и числа запросов представлений posts.
+
+Запросы идут через тестовый клиент Django в текущем процессе,
+поэтому в замер попадают представления, шаблоны и база,
+но не сеть и веб-сервер. Отчет — JSON, который удобно сравнивать
+между коммитами через compare_reports().
+"""
+import platform
+import random
+import subprocess
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connection,
+                       connections)
+from django.db.models import Count
+from django.template import Engine, RequestContext, engines
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from core.db import read_alias
+
+from .models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+         'add_comment')
+
+COMMENT_TEXT = 'Комментарий из замера'
+
+# Настройки SQLite по умолчанию: с ними сравнивается SQLITE_PRAGMAS
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'mmap_size': 0,
+    'cache_size': -2000,
+}
+
+
+def percentile(values, percent):
+    """ Перцентиль по ближайшему рангу. """
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class ViewBenchmark:
+    """
+    Запросы к представлениям со случайными, но воспроизводимыми
+    аргументами: группы, авторы, посты и номера страниц.
+    """
+
+    def __init__(self, seed=0, cold=False):
+        self.random = random.Random(seed)
+        self.cold = cold
+        self.client = Client()
+        # Читатель с наибольшим числом подписок — худший случай
+        # для ленты подписок
+        reader_id = (Follow.objects.values('user')
+                     .annotate(total=Count('pk'))
+                     .order_by('-total')
+                     .values_list('user', flat=True)
+                     .first())
+        self.reader = (User.objects.get(pk=reader_id) if reader_id
+                       else User.objects.order_by('pk').first())
+        self.client.force_login(self.reader)
+        self.group_slugs = list(Group.objects.values_list('slug', flat=True))
+        self.usernames = list(User.objects.order_by('pk')
+                              .values_list('username', flat=True)[:1000])
+        self.max_post_id = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        self.pages = max(1, Post.objects.count()
+                         // settings.NUM_OBJECTS_TO_DISPLAY)
+
+    def _page(self):
+        # Чаще всего открывают первые страницы
+        return {'page': min(self.pages, int(self.random.paretovariate(1.2)))}
+
+    def _post_id(self):
+        return self.random.randint(1, self.max_post_id)
+
+    def request(self, view):
+        """ (метод, адрес, данные) для очередного запроса к view. """
+        if view == 'index':
+            return 'get', reverse('posts:index'), self._page()
+        if view == 'group_posts':
+            slug = self.random.choice(self.group_slugs)
+            return ('get', reverse('posts:group_list', args=[slug]),
+                    self._page())
+        if view == 'profile':
+            username = self.random.choice(self.usernames)
+            return 'get', reverse('posts:profile', args=[username]), {}
+        if view == 'post_detail':
+            return ('get', reverse('posts:post_detail',
+                                   args=[self._post_id()]), {})
+        if view == 'follow_index':
+            return 'get', reverse('posts:follow_index'), self._page()
+        if view == 'add_comment':
+            return ('post', reverse('posts:add_comment',
+                                    args=[self._post_id()]),
+                    {'text': COMMENT_TEXT})
+        raise ValueError(f'Неизвестное представление {view}')
+
+    def measure(self, view, iterations, warmup=3):
+        if view == 'group_posts' and not self.group_slugs:
+            return None
+        timings, queries, statuses = [], [], {}
+        for i in range(warmup + iterations):
+            method, path, data = self.request(view)
+            if self.cold:
+                cache.clear()
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(
+                    connections[alias])) for alias in query_aliases()]
+                started = time.perf_counter()
+                response = getattr(self.client, method)(path, data)
+                elapsed = time.perf_counter() - started
+            if i < warmup:
+                continue
+            timings.append(elapsed * 1000)
+            queries.append(sum(len(context) for context in captured))
+            statuses[response.status_code] = (
+                statuses.get(response.status_code, 0) + 1)
+        return {
+            'iterations': iterations,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries_min': min(queries),
+            'queries_max': max(queries),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'statuses': {str(code): count
+                         for code, count in sorted(statuses.items())},
+        }
+
+    def run(self, views=VIEWS, iterations=100):
+        # Комментарии замера не должны менять данные для следующих
+        # запусков, поэтому они удаляются в конце
+        last_comment = _last_comment()
+        try:
+            return {
+                'meta': self.meta(iterations),
+                'views': {view: self.measure(view, iterations)
+                          for view in views},
+            }
+        finally:
+            _delete_comments(last_comment)
+
+    def meta(self, iterations):
+        return {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cold_cache': self.cold,
+            'iterations': iterations,
+            'rows': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+        }
+
+
+def query_aliases():
+    """
+    Соединения, в которые идут запросы представлений:
+    чтения read_only_view уходят в соединение чтения (core.db).
+    """
+    return [alias for alias in (DEFAULT_DB_ALIAS, read_alias()) if alias]
+
+
+def _last_comment():
+    return Comment.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+
+
+def _delete_comments(last_comment):
+    """ Удаляет комментарии замера, добавленные после last_comment. """
+    Comment.objects.filter(pk__gt=last_comment, text=COMMENT_TEXT).delete()
+
+
+class ConcurrencyBenchmark:
+    """
+    Потоки одновременно читают посты и пишут комментарии
+    через тестовый клиент; каждый поток держит свои соединения с базой.
+    Сравниваются профили PRAGMA и соединение для чтения.
+    """
+
+    def __init__(self, threads=8, duration=10.0, write_share=0.2, seed=0):
+        self.threads = threads
+        self.duration = duration
+        self.write_share = write_share
+        self.seed = seed
+        self.users = list(User.objects.order_by('pk')[:threads])
+        self.max_post_id = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+    def _worker(self, number, client, deadline, results):
+        rnd = random.Random(f'{self.seed}:{number}')
+        try:
+            while time.perf_counter() < deadline:
+                post_id = rnd.randint(1, self.max_post_id)
+                kind = 'write' if rnd.random() < self.write_share else 'read'
+                started = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        response = client.post(
+                            reverse('posts:add_comment', args=[post_id]),
+                            {'text': COMMENT_TEXT})
+                    else:
+                        response = client.get(
+                            reverse('posts:post_detail', args=[post_id]))
+                except OperationalError as error:
+                    key = 'locked' if 'locked' in str(error) else 'errors'
+                    results[kind][key] += 1
+                    continue
+                elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code >= 500:
+                    results[kind]['errors'] += 1
+                else:
+                    results[kind]['timings'].append(elapsed)
+        finally:
+            connections.close_all()
+
+    def run_profile(self, pragmas, read_alias):
+        """ Один прогон с заданными PRAGMA и соединением для чтения. """
+        with override_settings(SQLITE_PRAGMAS=pragmas,
+                               DATABASE_READ_ALIAS=read_alias):
+            connections.close_all()
+            clients = []
+            for user in self.users:
+                client = Client()
+                client.force_login(user)
+                clients.append(client)
+            results = {kind: {'timings': [], 'locked': 0, 'errors': 0}
+                       for kind in ('read', 'write')}
+            last_comment = _last_comment()
+            deadline = time.perf_counter() + self.duration
+            workers = [
+                threading.Thread(target=self._worker,
+                                 args=(number, client, deadline, results))
+                for number, client in enumerate(clients)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            _delete_comments(last_comment)
+            connections.close_all()
+        return {kind: self._summary(result)
+                for kind, result in results.items()}
+
+    def _summary(self, result):
+        timings = result['timings'] or [0]
+        return {
+            'ok': len(result['timings']),
+            'per_second': round(len(result['timings']) / self.duration, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'locked': result['locked'],
+            'errors': result['errors'],
+        }
+
+    def run(self):
+        return {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'commit': git_commit(),
+                'threads': self.threads,
+                'duration': self.duration,
+                'write_share': self.write_share,
+            },
+            'profiles': {
+                'default': self.run_profile(DEFAULT_PRAGMAS, None),
+                'tuned': self.run_profile(settings.SQLITE_PRAGMAS,
+                                          settings.DATABASE_READ_ALIAS),
+            },
+        }
+
+
+class TemplateBenchmark:
+    """
+    Рендер posts/index.html с первой страницей ленты обычными
+    загрузчиками и cached.Loader. Посты загружаются заранее,
+    кэш фрагментов выключен, поэтому замеряются только шаблоны.
+    """
+    TEMPLATE = 'posts/index.html'
+
+    def __init__(self):
+        posts = list(Post.objects.for_feed()
+                     [:settings.NUM_OBJECTS_TO_DISPLAY])
+        path = reverse('posts:index')
+        self.request = RequestFactory().get(path)
+        self.request.user = AnonymousUser()
+        self.request.resolver_match = resolve(path)
+        self.context = {
+            'page_obj': Paginator(
+                posts, settings.NUM_OBJECTS_TO_DISPLAY).page(1),
+            'feed_cache_key': '',
+            'feed_cache_timeout': 0,
+        }
+
+    @staticmethod
+    def engine(cached):
+        """ Движок с настройками проекта и выбранными загрузчиками. """
+        base = engines['django'].engine
+        loaders = settings.TEMPLATE_LOADERS
+        if cached:
+            loaders = [('django.template.loaders.cached.Loader', loaders)]
+        return Engine(dirs=base.dirs,
+                      context_processors=base.context_processors,
+                      debug=base.debug, loaders=loaders,
+                      string_if_invalid=base.string_if_invalid,
+                      libraries=base.libraries)
+
+    def render(self, engine):
+        template = engine.get_template(self.TEMPLATE)
+        return template.render(RequestContext(self.request, self.context))
+
+    def measure(self, cached, iterations, warmup=3):
+        engine = self.engine(cached)
+        timings = []
+        for i in range(warmup + iterations):
+            started = time.perf_counter()
+            self.render(engine)
+            timings.append((time.perf_counter() - started) * 1000)
+        first, timings = timings[0], timings[warmup:]
+        return {
+            'first_ms': round(first, 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+        }
+
+    def run(self, iterations=200):
+        return {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'template': self.TEMPLATE,
+                'posts': len(self.context['page_obj']),
+                'debug': engines['django'].engine.debug,
+                'iterations': iterations,
+            },
+            'loaders': {
+                'default': self.measure(False, iterations),
+                'cached': self.measure(True, iterations),
+            },
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(baseline, report):
+    """ Строки сравнения p50/p95 и запросов с прошлым отчетом. """
+    lines = []
+    for view, result in report['views'].items():
+        before = baseline.get('views', {}).get(view)
+        if not result or not before:
+            continue
+        parts = []
+        for key in ('p50_ms', 'p95_ms', 'queries_mean'):
+            change = ((result[key] - before[key]) / before[key] * 100
+                      if before[key] else 0)
+            parts.append(f'{key} {before[key]} -> {result[key]} '
+                         f'({change:+.1f}%)')
+        lines.append(f'{view}: ' + ', '.join(parts))
+    return lines
@@ -0,0 +1,121 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from core.pagecache import cache_shared_page
+
+
+FEED_VERSION_KEY = 'feed_version:{}'
+
+# Параметры запроса, от которых зависят страницы лент и поста
+PAGE_QUERY_PARAMS = ('page', 'after', 'before')
+
+# Области, от которых зависят фрагменты лент.
+INDEX_SCOPES = ('index', 'groups', 'authors')
+
+
+def group_scopes(group):
+    return (f'group:{group.pk}', 'authors')
+
+
+def profile_scopes(author):
+    return (f'profile:{author.pk}', 'groups')
+
+
+def post_scopes(post):
+    """ Области страницы поста: сам пост, комментарии, автор и группа. """
+    return (f'post:{post.pk}', f'profile:{post.author_id}', 'groups',
+            'authors')
+
+
+def follow_scopes(*user_ids):
+    """ Области подписок: счетчики и кнопка подписки в профиле. """
+    return tuple(f'follows:{user_id}' for user_id in user_ids)
+
+
+def get_feed_versions(scopes):
+    """
+    Текущие версии областей ленты.
+    Отсутствующая в кэше версия заменяется новой случайной,
+    поэтому вытесненный или истекший (FEED_VERSION_TIMEOUT) ключ
+    не может воскресить старые фрагменты.
+    """
+    keys = [FEED_VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, settings.FEED_VERSION_TIMEOUT)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_feed_versions(*scopes):
+    """ Инвалидирует все фрагменты, зависящие от областей scopes. """
+    cache.set_many(
+        {FEED_VERSION_KEY.format(scope): uuid4().hex for scope in scopes},
+        settings.FEED_VERSION_TIMEOUT
+    )
+
+
+def bump_post_feeds(post, *group_ids):
+    """
+    Сбрасывает ленты, в которых виден пост.
+    group_ids — прежние группы поста, если он переехал.
+    """
+    scopes = {'index', f'profile:{post.author_id}'}
+    for group_id in (post.group_id, *group_ids):
+        if group_id:
+            scopes.add(f'group:{group_id}')
+    bump_feed_versions(*scopes)
+
+
+def feed_cache_context(request, page_obj, scopes):
+    """
+    Переменные контекста для {% cache %} ленты:
+    ключ учитывает версии областей и номер страницы или курсор.
+    """
+    if getattr(page_obj, 'is_cursor', False):
+        page_key = (f'after={request.GET.get("after", "")}'
+                    f'&before={request.GET.get("before", "")}')
+    else:
+        page_key = f'page={page_obj.number}'
+    versions = get_feed_versions(scopes)
+    return {
+        'feed_cache_key': ':'.join([page_key, *versions]),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def page_version(scopes):
+    """ Версия данных страницы по версиям областей scopes. """
+    return md5(':'.join(get_feed_versions(scopes)).encode()).hexdigest()
+
+
+def feed_page(scopes_func, user_context=None):
+    """
+    ETag (ответ 304) и кэш страницы целиком (core.pagecache) по версиям
+    областей scopes_func(request, *args, **kwargs).
+    Шапка и кнопки зависят от читателя, поэтому в ETag входит
+    id пользователя; параметры страницы браузер различает сам —
+    ETag хранится для каждого адреса. В ключ кэша входят
+    только параметры из PAGE_QUERY_PARAMS.
+    """
+    def version(request, *args, **kwargs):
+        if not hasattr(request, '_page_version'):
+            request._page_version = page_version(
+                scopes_func(request, *args, **kwargs))
+        return request._page_version
+
+    def etag(request, *args, **kwargs):
+        user_id = request.user.pk if request.user.is_authenticated else 0
+        page = version(request, *args, **kwargs)
+        return md5(f'{user_id}:{page}'.encode()).hexdigest()
+
+    def decorator(view):
+        view = cache_shared_page(version, user_context,
+                                 PAGE_QUERY_PARAMS)(view)
+        return condition(etag_func=etag)(view)
+    return decorator
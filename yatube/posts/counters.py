@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, UserCounters
+
+
+User = get_user_model()
+
+
+def _count_of(queryset, field):
+    """ Подзапрос с числом строк queryset для OuterRef('pk'). """
+    counts = (queryset
+              .filter(**{field: OuterRef('pk')})
+              .order_by()
+              .values(field)
+              .annotate(total=Count('pk'))
+              .values('total'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _changed(name, delta):
+    """
+    F(name) + delta, но не меньше нуля: счетчик мог разойтись
+    с данными (например, после импорта до recount), а уход
+    PositiveIntegerField в минус — IntegrityError.
+    """
+    return Greatest(F(name) + delta, 0)
+
+
+def change_user_counters(user_id, **deltas):
+    """
+    Атомарно меняет счетчики пользователя на deltas.
+    Если строки счетчиков еще нет, при увеличении она создается
+    пересчетом, а уменьшение пропускается: пользователь может
+    быть в процессе удаления.
+    """
+    updated = (UserCounters.objects
+               .filter(user_id=user_id)
+               .update(**{name: _changed(name, delta)
+                          for name, delta in deltas.items()}))
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        recount_users([user_id])
+
+
+def change_comments_count(post_id, delta):
+    (Post.objects
+     .filter(pk=post_id)
+     .update(comments_count=_changed('comments_count', delta)))
+
+
+def get_user_counters(user):
+    """
+    Счетчики пользователя без агрегирующих запросов,
+    если они загружены через select_related('counters').
+    """
+    counters = getattr(user, 'counters', None)
+    if counters is None:
+        recount_users([user.pk])
+        counters = UserCounters.objects.get(user=user)
+    return counters
+
+
+def recount_users(user_ids=None):
+    """ Пересчитывает счетчики пользователей, создавая недостающие. """
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    UserCounters.objects.bulk_create(
+        (UserCounters(user_id=user_id)
+         for user_id in users.values_list('pk', flat=True).iterator()),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    counters = UserCounters.objects.filter(user__in=users)
+    return counters.update(
+        posts_count=_count_of(Post.objects.all(), 'author'),
+        followers_count=_count_of(Follow.objects.all(), 'author'),
+        following_count=_count_of(Follow.objects.all(), 'user'),
+    )
+
+
+def recount_posts(post_ids=None):
+    """ Пересчитывает число комментариев у постов. """
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    return posts.update(
+        comments_count=_count_of(Comment.objects.all(), 'post')
+    )
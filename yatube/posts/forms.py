@@ -1,4 +1,7 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
+from .images import normalize_image
 from .models import Post, Comment
 
 
@@ -7,6 +10,21 @@ class PostForm(ModelForm):
         model = Post
         fields = ['text', 'group', 'image']
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Уже сохраненная картинка или ее удаление
+        if not isinstance(image, UploadedFile):
+            return image
+        if settings.POST_IMAGE_KEEP_ORIGINALS:
+            self.original_image = image
+        return normalize_image(image)
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            self.instance.original_image = getattr(self, 'original_image',
+                                                   '')
+        return super().save(commit)
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,90 @@
+"""
+Обработка картинок постов при загрузке.
+
+Картинка проверяется по заголовку до полного декодирования,
+поэтому «бомбы» с огромными размерами отклоняются, не занимая память.
+Затем она поворачивается по EXIF, уменьшается до POST_IMAGE_MAX_SIDE,
+теряет все метаданные и пересохраняется в POST_IMAGE_FORMATS.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def supported_formats(formats):
+    """ Форматы из formats, которые умеет сохранять Pillow. """
+    return [
+        image_format for image_format in formats
+        if image_format != 'WEBP' or features.check('webp')
+    ]
+
+
+def output_format(has_alpha=False):
+    """ Формат, в который пересохраняется загруженная картинка. """
+    formats = supported_formats(settings.POST_IMAGE_FORMATS) or ['JPEG']
+    image_format = formats[0]
+    if has_alpha and image_format == 'JPEG':
+        return 'PNG'
+    return image_format
+
+
+def _has_alpha(image):
+    return (image.mode in ('RGBA', 'LA', 'PA')
+            or (image.mode == 'P' and 'transparency' in image.info))
+
+
+def normalize_image(upload):
+    """
+    Возвращает обработанную копию загруженной картинки
+    или бросает ValidationError.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': settings.POST_IMAGE_MAX_UPLOAD_SIZE // 2 ** 20}
+        )
+    upload.seek(0)
+    try:
+        # open читает только заголовок
+        image = Image.open(upload)
+    except Exception:
+        raise ValidationError('Загрузите корректную картинку.',
+                              code='invalid_image')
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)d×%(height)d.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height}
+        )
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    try:
+        # JPEG сразу декодируется в уменьшенном масштабе
+        image.draft('RGB', (max_side, max_side))
+        # У анимаций остается только первый кадр
+        image = ImageOps.exif_transpose(image)
+    except Exception:
+        raise ValidationError('Загрузите корректную картинку.',
+                              code='invalid_image')
+    has_alpha = _has_alpha(image)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    # Без info Pillow не переносит EXIF, ICC и комментарии
+    image.info = {}
+    image_format = output_format(has_alpha)
+    options = {'optimize': True}
+    if image_format != 'PNG':
+        options['quality'] = settings.POST_IMAGE_QUALITY
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(buffer.getvalue(),
+                       name=f'{stem}.{EXTENSIONS[image_format]}')
@@ -0,0 +1,245 @@
+"""
+Загрузка выгрузки posts.export (NDJSON или CSV) в эту базу.
+
+Файл читается потоково, авторы и группы находятся по словарям
+username -> pk и slug -> pk, которые строятся один раз.
+Записи вставляются bulk_create пачками; пачка и позиция в ImportJob
+сохраняются в одной транзакции, поэтому после сбоя загрузка
+продолжается с первой незагруженной пачки.
+Ключи постов и комментариев источника сдвигаются на id_offset,
+так комментарии находят свои посты без таблицы соответствий.
+Сигналы при bulk_create не срабатывают: счетчики, поиск и кэш
+пересчитываются один раз после загрузки, миниатюры создаются
+в пуле потоков. Загрузка рассчитана на базу, в которую
+в это время не пишут посты и комментарии.
+"""
+import csv
+import json
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from .export import parse_watermark
+from .models import Comment, Follow, Group, ImportJob, Post
+from .seeding import BATCH_SIZE, manual_dates
+from .thumbnails import make_post_images
+
+
+User = get_user_model()
+
+MODELS = {
+    'posts': Post,
+    'comments': Comment,
+    'groups': Group,
+    'follows': Follow,
+}
+
+# Наборы, у которых сохраняются (со сдвигом) ключи источника
+KEEP_IDS = ('posts', 'comments')
+
+# Не больше стольких параметров в одном запросе pk__in
+LOOKUP_CHUNK = 500
+
+
+def read_records(path, input_format=None):
+    """ Словари записей файла NDJSON или CSV. """
+    if input_format is None:
+        input_format = 'csv' if path.endswith('.csv') else 'ndjson'
+    with open(path, encoding='utf-8', newline='') as file:
+        if input_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _existing(model, ids):
+    found = set()
+    for chunk in _chunks(ids, LOOKUP_CHUNK):
+        found.update(model.objects.filter(pk__in=chunk)
+                     .values_list('pk', flat=True))
+    return found
+
+
+def _image_name(value):
+    # Имена из чужого файла не должны выводить за пределы media/posts/
+    name = posixpath.normpath(value or '')
+    return name if name.startswith('posts/') else ''
+
+
+class Importer:
+    """ Загрузка одного набора источника source с продолжением. """
+
+    def __init__(self, source, dataset, batch_size=BATCH_SIZE,
+                 create_missing=False):
+        self.dataset = dataset
+        self.model = MODELS[dataset]
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.loaded = self.skipped = 0
+        if dataset == 'comments':
+            posts_job = ImportJob.objects.filter(
+                source=source, dataset='posts').first()
+            if posts_job is None:
+                raise ValueError(
+                    f'Сначала загрузите посты источника {source}')
+            self.post_offset = posts_job.id_offset
+        offset = 0
+        if dataset in KEEP_IDS:
+            offset = self.model.objects.aggregate(top=Max('pk'))['top'] or 0
+        self.job, _ = ImportJob.objects.get_or_create(
+            source=source, dataset=dataset, defaults={'id_offset': offset})
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+
+    def _resolve_users(self, usernames):
+        missing = {name for name in usernames
+                   if name and name not in self.users}
+        if not missing or not self.create_missing:
+            return
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in missing],
+            ignore_conflicts=True)
+        self.users.update(User.objects.filter(username__in=missing)
+                          .values_list('username', 'pk'))
+
+    def _resolve_groups(self, slugs):
+        missing = {slug for slug in slugs if slug and slug not in self.groups}
+        if not missing or not self.create_missing:
+            return
+        Group.objects.bulk_create(
+            [Group(slug=slug, title=slug, description='')
+             for slug in missing],
+            ignore_conflicts=True)
+        self.groups.update(Group.objects.filter(slug__in=missing)
+                           .values_list('slug', 'pk'))
+
+    def _posts(self, batch):
+        self._resolve_users(record['author'] for record in batch)
+        self._resolve_groups(record.get('group') for record in batch)
+        for record in batch:
+            author_id = self.users.get(record['author'])
+            group = record.get('group')
+            group_id = self.groups.get(group) if group else None
+            if author_id is None or (group and group_id is None):
+                continue
+            yield Post(pk=self.job.id_offset + int(record['id']),
+                       author_id=author_id, group_id=group_id,
+                       text=record['text'],
+                       pub_date=parse_watermark(record['pub_date']),
+                       image=_image_name(record.get('image')))
+
+    def _comments(self, batch):
+        self._resolve_users(record['author'] for record in batch)
+        posts = _existing(Post, {self.post_offset + int(record['post'])
+                                 for record in batch})
+        for record in batch:
+            author_id = self.users.get(record['author'])
+            post_id = self.post_offset + int(record['post'])
+            if author_id is None or post_id not in posts:
+                continue
+            yield Comment(pk=self.job.id_offset + int(record['id']),
+                          post_id=post_id, author_id=author_id,
+                          text=record['text'],
+                          created=parse_watermark(record['created']))
+
+    def _groups(self, batch):
+        for record in batch:
+            yield Group(slug=record['slug'], title=record['title'],
+                        description=record['description'])
+
+    def _follows(self, batch):
+        self._resolve_users(name for record in batch
+                            for name in (record['user'], record['author']))
+        for record in batch:
+            user_id = self.users.get(record['user'])
+            author_id = self.users.get(record['author'])
+            if user_id is not None and author_id is not None:
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    def run(self, records, progress=None):
+        """
+        Загружает записи после job.position. progress(job) вызывается
+        после каждой пачки.
+        """
+        build = getattr(self, f'_{self.dataset}')
+        records = islice(records, self.job.position, None)
+        with manual_dates(Post, 'pub_date'), \
+                manual_dates(Comment, 'created'):
+            for batch in _chunks(records, self.batch_size):
+                objects = list(build(batch))
+                with transaction.atomic():
+                    # Повтор пачки после сбоя не создает дублей
+                    self.model.objects.bulk_create(objects,
+                                                   ignore_conflicts=True)
+                    self.job.position += len(batch)
+                    self.job.save(update_fields=['position', 'updated'])
+                self.loaded += len(objects)
+                self.skipped += len(batch) - len(objects)
+                if progress is not None:
+                    progress(self.job)
+        if self.dataset in KEEP_IDS:
+            reset_sequences(self.model)
+
+
+def reset_sequences(*models):
+    """ Двигает последовательности ключей за вставленные явно id. """
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def _process_image(name, media_dir):
+    try:
+        if media_dir and not default_storage.exists(name):
+            with open(os.path.join(media_dir, name), 'rb') as file:
+                default_storage.save(name, File(file))
+        return name, make_post_images(name)
+    except OSError:
+        return name, (None, '')
+    finally:
+        connections.close_all()
+
+
+def process_images(job, media_dir=None, workers=1):
+    """
+    Копирует картинки загруженных постов из media_dir и создает
+    миниатюры в пуле потоков. Возвращает (создано, ошибок).
+    """
+    names = list(Post.objects.filter(pk__gt=job.id_offset, thumbnail='')
+                 .exclude(image='').order_by()
+                 .values_list('image', flat=True).distinct())
+    created = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(partial(_process_image, media_dir=media_dir),
+                           names)
+        for name, (thumbnail, variants) in results:
+            if thumbnail is None:
+                failed += 1
+                continue
+            created += 1
+            Post.objects.filter(image=name).update(
+                thumbnail=thumbnail, thumbnail_variants=variants)
+    return created, failed
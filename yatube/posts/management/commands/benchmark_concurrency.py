@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks import ConcurrencyBenchmark
+from posts.seeding import can_fork
+
+
+class Command(BaseCommand):
+    help = ('Нагружает базу одновременными чтениями постов и записью '
+            'комментариев из нескольких потоков: сначала с настройками '
+            'SQLite по умолчанию, затем с SQLITE_PRAGMAS и соединением '
+            'для чтения. Запускайте на заполненной копии базы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10.0,
+                            help='Секунд на каждый профиль.')
+        parser.add_argument('--write-share', type=float, default=0.2,
+                            help='Доля запросов на запись.')
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для отчета JSON.')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['duration'] <= 0:
+            raise CommandError(
+                '--threads и --duration должны быть больше нуля')
+        if not can_fork():
+            raise CommandError('Замер невозможен на базе в памяти')
+        benchmark = ConcurrencyBenchmark(
+            options['threads'], options['duration'],
+            options['write_share'], options['random_seed'])
+        if not benchmark.max_post_id or not benchmark.users:
+            raise CommandError('В базе нет постов или пользователей')
+        report = benchmark.run()
+        for profile, kinds in report['profiles'].items():
+            for kind, result in kinds.items():
+                self.stdout.write(
+                    f'{profile} {kind}: {result["per_second"]}/с, '
+                    f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+                    f'locked {result["locked"]}, ошибок {result["errors"]}'
+                )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчет записан в {options["output"]}'))
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает объем картинок первой страницы ленты: '
+            'оригиналы, единая миниатюра и варианты из srcset '
+            'для заданных ширин экрана.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--viewports', type=int, nargs='+', default=[375, 768, 1440],
+            help='Ширины экрана в CSS-пикселях.'
+        )
+        parser.add_argument(
+            '--dpr', type=float, default=1.0,
+            help='Плотность пикселей экрана.'
+        )
+
+    def size(self, post, name):
+        try:
+            return post.image.storage.size(name)
+        except OSError:
+            return 0
+
+    def pick(self, sizes, needed):
+        # Браузер берет самый узкий вариант не уже нужной ширины
+        for width, name in sizes:
+            if width >= needed:
+                return name
+        return sizes[-1][1]
+
+    def handle(self, *args, **options):
+        posts = (Post.objects
+                 .exclude(image='')
+                 .order_by('-pub_date', '-pk')
+                 [:settings.NUM_OBJECTS_TO_DISPLAY])
+        originals = thumbnails = 0
+        by_viewport = dict.fromkeys(options['viewports'], 0)
+        for post in posts:
+            originals += self.size(post, post.image.name)
+            thumbnail = (self.size(post, post.thumbnail)
+                         if post.thumbnail else 0)
+            thumbnails += thumbnail
+            variants = post.thumbnail_sizes
+            sizes = variants.get('WEBP') or variants.get('JPEG')
+            for viewport in by_viewport:
+                if not sizes:
+                    by_viewport[viewport] += thumbnail
+                    continue
+                # sizes="(max-width: 960px) 100vw, 960px"
+                needed = min(viewport, 960) * options['dpr']
+                by_viewport[viewport] += self.size(post,
+                                                   self.pick(sizes, needed))
+        self.stdout.write(f'Оригиналы: {originals} байт')
+        self.stdout.write(f'Миниатюра {settings.POST_THUMBNAIL_GEOMETRY}: '
+                          f'{thumbnails} байт')
+        for viewport, total in by_viewport.items():
+            self.stdout.write(f'srcset, экран {viewport}px: {total} байт')
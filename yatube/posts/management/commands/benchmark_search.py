@@ -0,0 +1,104 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+
+from posts.search import FTS_TABLE, tokenize
+
+
+SYLLABLES = ('ка', 'ло', 'ми', 'ну', 'ре', 'ст', 'то', 'ва', 'ди', 'по',
+             'на', 'ко', 'ли', 'ра', 'се', 'те', 'бо', 'жи', 'мо', 'ча')
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск LIKE \'%%q%%\' по всем постам с поиском '
+            'по индексу FTS5 на синтетической базе во временном файле.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000,
+                            help='Количество постов.')
+        parser.add_argument('--queries', type=int, default=20,
+                            help='Количество запросов каждого вида.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def vocabulary(self, rng, size=20000):
+        words = sorted({
+            ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+            for _ in range(size)
+        })
+        rng.shuffle(words)
+        return words
+
+    def texts(self, rng, words, count):
+        # Частоты слов по закону Ципфа, как в живом тексте
+        cum_weights = list(accumulate(
+            1 / rank for rank in range(1, len(words) + 1)))
+        for post_id in range(1, count + 1):
+            yield post_id, ' '.join(rng.choices(
+                words, cum_weights=cum_weights, k=rng.randint(5, 40)))
+
+    def timed(self, connection, queries):
+        started = time.perf_counter()
+        found = 0
+        for sql, params in queries:
+            found += len(connection.execute(sql, params).fetchall())
+        elapsed = (time.perf_counter() - started) / len(queries)
+        return elapsed * 1000, found / len(queries)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = self.vocabulary(rng)
+        with tempfile.TemporaryDirectory() as directory:
+            connection = sqlite3.connect(
+                os.path.join(directory, 'search.sqlite3'))
+            connection.execute(
+                'CREATE TABLE posts_post (id INTEGER PRIMARY KEY, text TEXT)')
+            connection.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                f'text, tokenize="unicode61 remove_diacritics 0")')
+            started = time.perf_counter()
+            connection.executemany('INSERT INTO posts_post VALUES (?, ?)',
+                                   self.texts(rng, words, options['posts']))
+            connection.commit()
+            self.stdout.write(f'Посты: {options["posts"]} '
+                              f'за {time.perf_counter() - started:.1f} с')
+            started = time.perf_counter()
+            connection.execute(f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                               f'SELECT id, text FROM posts_post')
+            connection.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) "
+                               f"VALUES ('optimize')")
+            connection.commit()
+            self.stdout.write(f'Индекс FTS5 за '
+                              f'{time.perf_counter() - started:.1f} с')
+            # Редкие слова из хвоста словаря и пары частых слов
+            samples = [
+                ' '.join(rng.sample(words[100:], 1))
+                for _ in range(options['queries'])
+            ] + [
+                ' '.join(rng.sample(words[:50], 2))
+                for _ in range(options['queries'])
+            ]
+            like = self.timed(connection, [
+                ('SELECT id FROM posts_post WHERE '
+                 + ' AND '.join(['text LIKE ?'] * len(query.split()))
+                 + ' ORDER BY id DESC LIMIT 1000',
+                 [f'%{word}%' for word in query.split()])
+                for query in samples
+            ])
+            fts = self.timed(connection, [
+                (f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? '
+                 f'ORDER BY rank, rowid DESC LIMIT 1000',
+                 [' '.join(f'"{term}"' for term in tokenize(query))])
+                for query in samples
+            ])
+            connection.close()
+        self.stdout.write(f'LIKE: {like[0]:.1f} мс на запрос, '
+                          f'в среднем {like[1]:.0f} постов')
+        self.stdout.write(self.style.SUCCESS(
+            f'FTS5: {fts[0]:.1f} мс на запрос, '
+            f'в среднем {fts[1]:.0f} постов'
+        ))
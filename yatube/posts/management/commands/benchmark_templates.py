@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks import TemplateBenchmark
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время рендера posts/index.html с первой страницей '
+            'ленты обычными загрузчиками шаблонов и cached.Loader.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--output', help='Файл для отчета JSON.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть больше нуля')
+        if not Post.objects.exists():
+            raise CommandError('В базе нет постов')
+        report = TemplateBenchmark().run(options['iterations'])
+        for loaders, result in report['loaders'].items():
+            self.stdout.write(
+                f'{loaders}: первый рендер {result["first_ms"]} мс, '
+                f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчет записан в {options["output"]}'))
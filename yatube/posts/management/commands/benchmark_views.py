@@ -0,0 +1,69 @@
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks import VIEWS, ViewBenchmark, compare_reports
+
+
+class Command(BaseCommand):
+    help = ('Замеряет перцентили времени ответа и число запросов '
+            'представлений posts и пишет отчет JSON. С --seed сначала '
+            'заполняет базу синтетическими данными — запускайте '
+            'на отдельной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true',
+                            help='Заполнить базу перед замером.')
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=5_000_000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--views', nargs='+', choices=VIEWS,
+                            default=list(VIEWS))
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--output', help='Файл для отчета JSON.')
+        parser.add_argument('--compare',
+                            help='Прошлый отчет JSON для сравнения.')
+
+    def seed(self, options):
+        call_command(
+            'seed_yatube', users=options['users'], groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows_per_user=options['follows_per_user'],
+            random_seed=options['random_seed'],
+            stdout=self.stdout, stderr=self.stderr
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть больше нуля')
+        if options['seed']:
+            self.seed(options)
+        benchmark = ViewBenchmark(options['random_seed'], options['cold'])
+        report = benchmark.run(options['views'], options['iterations'])
+        for view, result in report['views'].items():
+            if result is None:
+                self.stdout.write(f'{view}: нет данных')
+                continue
+            self.stdout.write(
+                f'{view}: p50 {result["p50_ms"]} мс, '
+                f'p95 {result["p95_ms"]} мс, p99 {result["p99_ms"]} мс, '
+                f'запросов {result["queries_mean"]}'
+            )
+        if options['compare']:
+            with open(options['compare']) as file:
+                for line in compare_reports(json.load(file), report):
+                    self.stdout.write(line)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(text)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчет записан в {options["output"]}'))
+        else:
+            self.stdout.write(text)
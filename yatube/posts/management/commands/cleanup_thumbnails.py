@@ -0,0 +1,67 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Чистит хранилище миниатюр от записей об удаленных '
+            'картинках и удаляет файлы из media/cache/, '
+            'на которые никто не ссылается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены.'
+        )
+
+    def referenced_names(self):
+        kvstore = default.kvstore
+        names = set()
+        for key in kvstore._find_keys(identity='thumbnails'):
+            for thumbnail_key in kvstore._get(key, 'thumbnails') or []:
+                thumbnail = kvstore._get(thumbnail_key)
+                if thumbnail:
+                    names.add(thumbnail.name)
+        names.update(Post.objects
+                     .exclude(thumbnail='')
+                     .values_list('thumbnail', flat=True)
+                     .iterator())
+        for variants in (Post.objects
+                         .exclude(thumbnail_variants='')
+                         .values_list('thumbnail_variants', flat=True)
+                         .iterator()):
+            for sizes in json.loads(variants).values():
+                names.update(name for _, name in sizes)
+        return names
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            default.kvstore.cleanup()
+        referenced = self.referenced_names()
+        prefix = thumbnail_settings.THUMBNAIL_PREFIX
+        root = os.path.join(settings.MEDIA_ROOT, prefix)
+        removed = 0
+        for directory, _, files in os.walk(root, topdown=False):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, settings.MEDIA_ROOT)
+                name = name.replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                removed += 1
+                self.stdout.write(f'Сирота: {name}')
+                if not options['dry_run']:
+                    os.remove(path)
+            if not options['dry_run'] and directory != root:
+                if not os.listdir(directory):
+                    os.rmdir(directory)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {removed}'
+            if not options['dry_run'] else f'Найдено сирот: {removed}'
+        ))
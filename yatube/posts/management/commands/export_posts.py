@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (DATASETS, FORMATS, csv_lines, export_rows,
+                          ndjson_lines, parse_watermark)
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты, комментарии, группы или подписки '
+            'в NDJSON или CSV. С --since выгружаются только строки '
+            'новее отметки; отметка для следующего запуска печатается '
+            'в stderr.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', nargs='?', choices=DATASETS,
+                            default='posts')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument(
+            '--since',
+            help='Дата или дата со временем в ISO 8601 (pub_date/created).'
+        )
+        parser.add_argument('--output', help='Файл; по умолчанию stdout.')
+        parser.add_argument('--chunk-size', type=int)
+
+    def write(self, lines, path):
+        if path:
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        date_field = DATASETS[dataset][2]
+        try:
+            since = (parse_watermark(options['since'])
+                     if options['since'] else None)
+            rows = export_rows(dataset, since, options['chunk_size'])
+        except ValueError as error:
+            raise CommandError(error)
+        watermark, count = [since], [0]
+
+        def tracked():
+            for row in rows:
+                count[0] += 1
+                if date_field:
+                    watermark[0] = row[date_field]
+                yield row
+
+        if options['format'] == 'csv':
+            self.write(csv_lines(dataset, tracked()), options['output'])
+        else:
+            self.write(ndjson_lines(tracked()), options['output'])
+        self.stderr.write(f'Выгружено строк: {count[0]}')
+        if watermark[0] is not None:
+            self.stderr.write(
+                f'Отметка для --since: {watermark[0].isoformat()}')
@@ -0,0 +1,91 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FORMATS
+from posts.importing import MODELS, Importer, process_images, read_records
+from posts.seeding import BATCH_SIZE, finish_seeding
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_posts (NDJSON или CSV) пачками '
+            'bulk_create. Прерванная загрузка того же --source '
+            'продолжается с места сбоя. Комментарии загружаются после '
+            'постов того же источника.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=MODELS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--source', default='import',
+            help='Имя источника: по нему продолжается загрузка '
+                 'и связываются комментарии с постами.'
+        )
+        parser.add_argument('--format', choices=FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов (без пароля) и группы, '
+                 'а не пропускать их записи.'
+        )
+        parser.add_argument(
+            '--media-dir',
+            help='MEDIA_ROOT источника, откуда копируются картинки постов.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Количество потоков обработки картинок.'
+        )
+        parser.add_argument(
+            '--skip-images', action='store_true',
+            help='Не создавать миниатюры (позже — warm_thumbnails).'
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счетчики, поиск и кэш — например, '
+                 'если следом загружается еще один файл.'
+        )
+
+    def progress(self, job):
+        self.stdout.write(f'Загружено записей: {job.position}')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError(
+                '--batch-size и --workers должны быть больше нуля')
+        dataset = options['dataset']
+        try:
+            importer = Importer(options['source'], dataset,
+                                options['batch_size'],
+                                options['create_missing'])
+        except ValueError as error:
+            raise CommandError(error)
+        if importer.job.position:
+            self.stdout.write(
+                f'Продолжение с записи {importer.job.position}')
+        started = time.perf_counter()
+        try:
+            importer.run(read_records(options['path'], options['format']),
+                         self.progress if options['verbosity'] > 1 else None)
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(
+                f'Загрузка остановлена на записи {importer.job.position}: '
+                f'{error!r}. Повторный запуск продолжит с нее.')
+        elapsed = time.perf_counter() - started
+        rows = importer.loaded + importer.skipped
+        self.stdout.write(
+            f'Записей: {importer.loaded}, пропущено: {importer.skipped}, '
+            f'{rows / elapsed if elapsed else 0:.0f} записей/с')
+        if dataset == 'posts' and not options['skip_images']:
+            created, failed = process_images(
+                importer.job, options['media_dir'], options['workers'])
+            self.stdout.write(
+                f'Миниатюр: {created}, ошибок: {failed}')
+        if not options['no_rebuild']:
+            started = time.perf_counter()
+            finish_seeding()
+            self.stdout.write(f'Пересчет счетчиков и поиска: '
+                              f'{time.perf_counter() - started:.1f} с')
+        self.stdout.write(self.style.SUCCESS('Готово'))
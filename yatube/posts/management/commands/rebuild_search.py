@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает поисковый индекс постов '
+            'бэкенда из POST_SEARCH_BACKEND.')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Бэкенд {backend.name}, проиндексировано постов: {indexed}'
+        ))
@@ -0,0 +1,89 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import (BATCH_SIZE, Seeder, can_fork, enable_wal,
+                           finish_seeding, seed_parallel)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками через bulk_create '
+            'и печатает скорость вставки. Посты и комментарии '
+            'генерируются в --workers процессах; для SQLite включается '
+            'WAL. Запускайте на отдельной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=5_000_000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок создать для постов.'
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.3,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Количество процессов для постов и комментариев.'
+        )
+
+    def timed(self, title, function, *args, **kwargs):
+        started = time.perf_counter()
+        rows = function(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        self.total_rows += rows
+        self.stdout.write(
+            f'{title}: {rows} строк за {elapsed:.1f} с, '
+            f'{rows / elapsed if elapsed else 0:.0f} строк/с'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError(
+                '--workers и --batch-size должны быть больше нуля')
+        workers = options['workers']
+        if workers > 1 and not can_fork():
+            self.stderr.write('База в памяти: генерация в одном процессе')
+            workers = 1
+        journal_mode = enable_wal()
+        if journal_mode:
+            self.stdout.write(f'Журнал SQLite: {journal_mode}')
+        seed, batch_size = options['random_seed'], options['batch_size']
+        seeder = Seeder(seed, batch_size)
+        images = seeder.images(options['images'])
+        post_options = {'images': images,
+                        'image_share': options['image_share']}
+        self.total_rows = 0
+        started = time.perf_counter()
+        self.timed('Пользователи', seeder.users, options['users'])
+        self.timed('Группы', seeder.groups, options['groups'])
+        if workers > 1:
+            self.timed('Посты', seed_parallel, 'posts', options['posts'],
+                       workers, seed, batch_size, **post_options)
+            self.timed('Комментарии', seed_parallel, 'comments',
+                       options['comments'], workers, seed, batch_size)
+        else:
+            self.timed('Посты', seeder.posts, options['posts'],
+                       **post_options)
+            self.timed('Комментарии', seeder.comments, options['comments'])
+        self.timed('Подписки', seeder.follows, options['follows_per_user'])
+        recount_started = time.perf_counter()
+        finish_seeding()
+        self.stdout.write(f'Пересчет счетчиков и поиска: '
+                          f'{time.perf_counter() - recount_started:.1f} с')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {self.total_rows} строк за {elapsed:.1f} с, '
+            f'{self.total_rows / elapsed:.0f} строк/с'
+        ))
+        if images:
+            self.stdout.write('Миниатюры создаст python manage.py '
+                              'warm_thumbnails')
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.caching import bump_post_feeds
+from posts.models import Post
+from posts.thumbnails import make_post_images
+
+
+def _make_in_worker(image_name):
+    try:
+        return image_name, make_post_images(image_name)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Создает миниатюры для уже загруженных картинок '
+            'в media/posts/ в несколько потоков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Количество потоков генерации.'
+        )
+
+    def image_names(self):
+        directory = os.path.join(settings.MEDIA_ROOT, 'posts')
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            f'posts/{name}' for name in os.listdir(directory)
+            if os.path.isfile(os.path.join(directory, name))
+        )
+
+    def handle(self, *args, **options):
+        names = self.image_names()
+        created = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            if options['workers'] > 1:
+                results = pool.map(_make_in_worker, names)
+            else:
+                results = ((name, make_post_images(name)) for name in names)
+            for image_name, (thumbnail, variants) in results:
+                if thumbnail is None:
+                    failed += 1
+                    self.stderr.write(f'Пропущено: {image_name}')
+                    continue
+                created += 1
+                posts = Post.objects.filter(image=image_name)
+                updated = (posts
+                           .exclude(thumbnail=thumbnail,
+                                    thumbnail_variants=variants)
+                           .update(thumbnail=thumbnail,
+                                   thumbnail_variants=variants))
+                if updated:
+                    for post in posts.only('author', 'group'):
+                        bump_post_feeds(post)
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюр: {created}, ошибок: {failed}'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='original_image',
+            field=models.ImageField(blank=True, editable=False, upload_to='posts/originals/', verbose_name='Исходная картинка'),
+        ),
+    ]
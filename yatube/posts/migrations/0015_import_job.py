@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_comment_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100, verbose_name='Источник')),
+                ('dataset', models.CharField(max_length=20, verbose_name='Набор')),
+                ('position', models.PositiveIntegerField(default=0, verbose_name='Загружено записей')),
+                ('id_offset', models.PositiveIntegerField(default=0, verbose_name='Сдвиг ключей')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Загрузка',
+                'verbose_name_plural': 'Загрузки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importjob',
+            constraint=models.UniqueConstraint(fields=('source', 'dataset'), name='unique_import_job'),
+        ),
+    ]
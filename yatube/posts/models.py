@@ -1,5 +1,8 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 
 
 User = get_user_model()
@@ -14,6 +17,16 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """ Посты вместе с автором и группой одним запросом. """
+        return self.select_related('author', 'group')
+
+    def for_detail(self):
+        """ Пост для страницы поста вместе со счетчиками автора. """
+        return self.select_related('author__counters', 'group')
+
+
 class Post(models.Model):
     text = models.TextField('Текст', help_text='Текст нового поста')
     pub_date = models.DateTimeField(auto_now_add=True)
@@ -36,15 +49,78 @@ class Post(models.Model):
         blank=True,
         verbose_name='Картинка'
     )
+    original_image = models.ImageField(
+        'Исходная картинка',
+        upload_to='posts/originals/',
+        blank=True,
+        editable=False
+    )
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    thumbnail_variants = models.TextField(
+        'Варианты миниатюры',
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta():
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnail_url(self):
+        """ Адрес готовой миниатюры или пустая строка. """
+        if not self.thumbnail:
+            return ''
+        return self.image.storage.url(self.thumbnail)
+
+    @cached_property
+    def thumbnail_sizes(self):
+        """ Варианты миниатюры по форматам: [[ширина, имя], ...]. """
+        try:
+            return json.loads(self.thumbnail_variants or '{}')
+        except ValueError:
+            return {}
+
+    def _srcset(self, image_format):
+        return ', '.join(
+            f'{self.image.storage.url(name)} {width}w'
+            for width, name in self.thumbnail_sizes.get(image_format, [])
+        )
+
+    @property
+    def thumbnail_srcset(self):
+        """ srcset из JPEG-вариантов миниатюры. """
+        return self._srcset('JPEG')
+
+    @property
+    def thumbnail_webp_srcset(self):
+        """ srcset из WebP-вариантов миниатюры. """
+        return self._srcset('WEBP')
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -62,6 +138,12 @@ class Comment(models.Model):
 
     class Meta():
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+            models.Index(fields=['-created'],
+                         name='comment_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -77,7 +159,82 @@ class Follow(models.Model):
     )
 
     class Meta():
-        models.UniqueConstraint(
-            fields=['user', 'author'],
-            name='unique_follow_pair'
-        )
+        # Уникальный индекс (user, author) заодно ускоряет поиск подписок
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow_pair'
+            ),
+        ]
+
+
+class UserCounters(models.Model):
+    """
+    Денормализованные счетчики пользователя.
+    Обновляются сигналами через F(), чинятся командой recount.
+    """
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='counters',
+        on_delete=models.CASCADE
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta():
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return f'Счетчики {self.user_id}'
+
+
+class SearchTerm(models.Model):
+    """
+    Запись обратного индекса поиска: слово и число его вхождений в пост.
+    Используется, когда в базе нет FTS5.
+    """
+    term = models.CharField('Слово', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    count = models.PositiveIntegerField('Вхождений')
+
+    class Meta():
+        # Уникальный индекс (term, post) служит и для поиска по слову
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term_post'
+            ),
+        ]
+
+
+class ImportJob(models.Model):
+    """
+    Состояние загрузки набора из внешнего источника командой import_posts.
+    position — сколько записей файла уже загружено, id_offset — сдвиг
+    первичных ключей источника в этой базе.
+    """
+    source = models.CharField('Источник', max_length=100)
+    dataset = models.CharField('Набор', max_length=20)
+    position = models.PositiveIntegerField('Загружено записей', default=0)
+    id_offset = models.PositiveIntegerField('Сдвиг ключей', default=0)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta():
+        verbose_name = 'Загрузка'
+        verbose_name_plural = 'Загрузки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'dataset'],
+                name='unique_import_job'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.source}: {self.dataset}'
@@ -0,0 +1,138 @@
+"""
+Массовая модерация постов и комментариев.
+
+Операции выполняются пачками по MODERATION_BATCH_SIZE строк обычными
+DELETE и UPDATE по списку id, без Collector и сигналов каждого объекта.
+Счетчики пересчитываются, а версии лент сбрасываются
+один раз для всех затронутых авторов, групп и постов.
+Из материализованных лент подписок удаленные посты не убираются:
+они пропускаются при чтении. Ленты тех, чьи подписки удалены,
+сбрасываются и собираются заново.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .caching import bump_feed_versions, follow_scopes
+from .counters import recount_posts, recount_users
+from .models import Comment, Follow, Post, SearchTerm
+from .search import TermIndexBackend, get_backend
+from .timelines import drop_timelines
+
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def _batches(queryset, progress=None, label=''):
+    """ Пачки id строк queryset по возрастанию первичного ключа. """
+    batch_size = settings.MODERATION_BATCH_SIZE
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk, done = 0, 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+        done += len(batch)
+        logger.info('%s: обработано %d', label, done)
+        if progress is not None:
+            progress(label, done)
+
+
+def _raw_delete(queryset):
+    return queryset._raw_delete(queryset.db)
+
+
+def _post_scopes(rows):
+    """ Области лент для строк (author_id, group_id). """
+    scopes = {'index'}
+    for author_id, group_id in rows:
+        scopes.add(f'profile:{author_id}')
+        if group_id:
+            scopes.add(f'group:{group_id}')
+    return scopes
+
+
+def delete_posts(queryset, progress=None):
+    """ Удаляет посты queryset вместе с комментариями и индексом. """
+    deleted, author_ids, scopes = 0, set(), set()
+    search = get_backend()
+    for batch in _batches(queryset, progress, 'Удаление постов'):
+        with transaction.atomic():
+            rows = list(Post.objects.filter(pk__in=batch)
+                        .values_list('author_id', 'group_id'))
+            _raw_delete(Comment.objects.filter(post_id__in=batch))
+            # Строки SearchTerm ссылаются на посты при любом бэкенде,
+            # у бэкенда 'python' это и есть весь индекс
+            _raw_delete(SearchTerm.objects.filter(post_id__in=batch))
+            if search.name != TermIndexBackend.name:
+                search.remove_posts(batch)
+            deleted += _raw_delete(Post.objects.filter(pk__in=batch))
+        author_ids.update(author_id for author_id, _ in rows)
+        scopes |= _post_scopes(rows)
+    if author_ids:
+        recount_users(author_ids)
+        bump_feed_versions(*scopes)
+    return deleted
+
+
+def regroup_posts(queryset, group, progress=None):
+    """ Переносит посты queryset в группу group (None — без группы). """
+    moved, scopes = 0, set()
+    for batch in _batches(queryset, progress, 'Перенос постов'):
+        posts = Post.objects.filter(pk__in=batch)
+        with transaction.atomic():
+            rows = list(posts.values_list('author_id', 'group_id'))
+            moved += posts.update(group=group)
+        scopes |= _post_scopes(rows)
+    if scopes:
+        if group is not None:
+            scopes.add(f'group:{group.pk}')
+        bump_feed_versions(*scopes)
+    return moved
+
+
+def delete_comments(queryset, progress=None):
+    """ Удаляет комментарии queryset и пересчитывает их число у постов. """
+    deleted, scopes = 0, set()
+    for batch in _batches(queryset, progress, 'Удаление комментариев'):
+        comments = Comment.objects.filter(pk__in=batch)
+        post_ids = set(comments.values_list('post_id', flat=True))
+        with transaction.atomic():
+            deleted += _raw_delete(comments)
+            recount_posts(post_ids)
+        scopes.update(f'post:{post_id}' for post_id in post_ids)
+    if scopes:
+        bump_feed_versions(*scopes)
+    return deleted
+
+
+def purge_authors(user_ids, progress=None):
+    """
+    Удаляет все посты, комментарии и подписки авторов
+    и отключает их учетные записи.
+    """
+    user_ids = set(user_ids)
+    posts = delete_posts(Post.objects.filter(author_id__in=user_ids),
+                         progress)
+    comments = delete_comments(
+        Comment.objects.filter(author_id__in=user_ids), progress)
+    follows = Follow.objects.filter(user_id__in=user_ids)
+    followed = Follow.objects.filter(author_id__in=user_ids)
+    affected = (set(follows.values_list('author_id', flat=True))
+                | set(followed.values_list('user_id', flat=True)))
+    with transaction.atomic():
+        _raw_delete(follows)
+        _raw_delete(followed)
+        User.objects.filter(pk__in=user_ids).update(is_active=False)
+        recount_users(affected | user_ids)
+    drop_timelines(affected | user_ids)
+    bump_feed_versions('authors',
+                       *(f'profile:{user_id}' for user_id in user_ids),
+                       *follow_scopes(*affected))
+    return {'users': len(user_ids), 'posts': posts, 'comments': comments}
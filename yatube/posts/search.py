@@ -0,0 +1,206 @@
+"""
+Полнотекстовый поиск по постам.
+
+На SQLite с FTS5 посты индексируются в виртуальной таблице posts_post_fts
+и ранжируются по bm25. Иначе используется обратный индекс SearchTerm,
+который строится на Python и ранжируется по TF-IDF.
+Индекс обновляется сигналами и перестраивается командой rebuild_search.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+from django.db.models.expressions import RawSQL
+
+from .models import Post, SearchTerm
+
+
+FTS_TABLE = 'posts_post_fts'
+
+# Как у токенизатора unicode61: слово — это буквы и цифры
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+MAX_TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+
+class RawSubquery(RawSQL):
+    """
+    Сырой подзапрос для фильтра __in. RawSQL заключает SQL в скобки,
+    и IN ((SELECT ...)) на SQLite берет только первую строку.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH]
+            for token in TOKEN_RE.findall(text.casefold())]
+
+
+class FTS5Backend:
+    name = 'fts5'
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+
+    def remove_post(self, post_id):
+        self.remove_posts([post_id])
+
+    def remove_posts(self, post_ids):
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                list(post_ids)
+            )
+
+    def rebuild(self):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) "
+                           f"VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _match(terms):
+        # Каждое слово в кавычках: пользовательский ввод
+        # не разбирается как синтаксис запросов FTS5
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def matching(self, terms):
+        return RawSubquery(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [self._match(terms)]
+        )
+
+    def search(self, terms, limit):
+        match = self._match(terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s',
+                [match, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TermIndexBackend:
+    name = 'python'
+
+    def _terms(self, post):
+        return [
+            SearchTerm(term=term, post_id=post.pk, count=count)
+            for term, count in Counter(tokenize(post.text)).items()
+        ]
+
+    def index_post(self, post):
+        with transaction.atomic():
+            SearchTerm.objects.filter(post_id=post.pk).delete()
+            SearchTerm.objects.bulk_create(self._terms(post))
+
+    def remove_post(self, post_id):
+        self.remove_posts([post_id])
+
+    def remove_posts(self, post_ids):
+        SearchTerm.objects.filter(post_id__in=post_ids)._raw_delete(
+            SearchTerm.objects.db)
+
+    def rebuild(self):
+        with transaction.atomic():
+            SearchTerm.objects.all().delete()
+            batch = []
+            for post in Post.objects.only('text').order_by().iterator():
+                batch.extend(self._terms(post))
+                if len(batch) >= 5000:
+                    SearchTerm.objects.bulk_create(batch)
+                    batch = []
+            SearchTerm.objects.bulk_create(batch)
+        return Post.objects.count()
+
+    def matching(self, terms):
+        return (SearchTerm.objects
+                .filter(term__in=terms)
+                .values('post')
+                .annotate(matched=Count('term'))
+                .filter(matched=len(terms))
+                .values('post'))
+
+    def search(self, terms, limit):
+        frequencies = dict(SearchTerm.objects
+                           .filter(term__in=terms)
+                           .values_list('term')
+                           .annotate(Count('post')))
+        if len(frequencies) < len(terms):
+            return []
+        total = Post.objects.count()
+        weights = {
+            term: math.log(1 + total / frequency)
+            for term, frequency in frequencies.items()
+        }
+        score = Sum(
+            Case(*[When(term=term, then=F('count') * weight)
+                   for term, weight in weights.items()],
+                 output_field=FloatField())
+        )
+        return list(SearchTerm.objects
+                    .filter(term__in=terms)
+                    .values('post')
+                    .annotate(matched=Count('term'), score=score)
+                    .filter(matched=len(terms))
+                    .order_by('-score', '-post')
+                    .values_list('post', flat=True)[:limit])
+
+
+@lru_cache()
+def _has_fts_table(database_name):
+    with connection.cursor() as cursor:
+        return FTS_TABLE in connection.introspection.table_names(cursor)
+
+
+def fts5_available():
+    """ Создана ли таблица FTS5 (миграция пропускает ее без FTS5). """
+    return (connection.vendor == 'sqlite'
+            and _has_fts_table(connection.settings_dict['NAME']))
+
+
+def get_backend():
+    """ Бэкенд из POST_SEARCH_BACKEND: 'fts5', 'python' или 'auto'. """
+    name = settings.POST_SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if fts5_available() else 'python'
+    return FTS5Backend() if name == 'fts5' else TermIndexBackend()
+
+
+def search_post_ids(query):
+    """ id постов, подходящих под все слова запроса, лучшие первыми. """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    return get_backend().search(terms, settings.POST_SEARCH_MAX_RESULTS)
+
+
+def matching_post_ids(query):
+    """
+    Подзапрос id всех постов со всеми словами запроса, без ранжирования
+    и без POST_SEARCH_MAX_RESULTS — для фильтра pk__in в админке.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    return get_backend().matching(terms)
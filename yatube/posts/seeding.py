@@ -0,0 +1,264 @@
+"""
+Синтетические данные для нагрузочных замеров.
+
+Строки вставляются bulk_create пачками, каждая пачка в своей транзакции,
+поэтому сигналы не срабатывают: счетчики, поисковый индекс и версии
+лент пересчитываются один раз в finish_seeding().
+Подписки и комментарии распределены по степенному закону:
+у немногих авторов и постов их большинство.
+Посты и комментарии можно вставлять из нескольких процессов
+через seed_parallel().
+"""
+import multiprocessing
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from .counters import recount_posts, recount_users
+from .models import Comment, Follow, Group, Post
+from .search import get_backend
+
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+# Все пользователи получают один пароль, чтобы под ними можно было войти
+PASSWORD = 'yatube-seed'
+
+# Сколько процесс ждет блокировку записи SQLite, пока пишут другие
+BUSY_TIMEOUT_MS = 60_000
+
+
+class Seeder:
+    """
+    Генератор данных с детерминированным seed.
+    Методы возвращают число вставленных строк.
+    Части одного запуска (part) получают свои случайные числа,
+    но общий порядок популярности авторов и постов.
+    """
+
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, days=365, part=0):
+        self.seed = seed
+        part_seed = f'{seed}:{part}' if part else seed
+        self.random = random.Random(part_seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(part_seed)
+        self.batch_size = batch_size
+        self.now = timezone.now()
+        self.days = days
+
+    def _insert(self, model, rows, **options):
+        inserted, batch = 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                inserted += self._flush(model, batch, **options)
+                batch = []
+        if batch:
+            inserted += self._flush(model, batch, **options)
+        return inserted
+
+    @staticmethod
+    def _flush(model, batch, **options):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, **options)
+        return len(batch)
+
+    def _date(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(self.days * 24 * 60 * 60))
+
+    def _power_law(self, size, exponent=1.1):
+        """ Накопленные веса рангов 1..size для random.choices. """
+        return list(accumulate(1 / rank ** exponent
+                               for rank in range(1, size + 1)))
+
+    def users(self, count, prefix='user'):
+        start = User.objects.count()
+        password = make_password(PASSWORD)
+        return self._insert(User, (
+            User(username=f'{prefix}{i}', password=password,
+                 first_name=self.faker.first_name(),
+                 last_name=self.faker.last_name())
+            for i in range(start, start + count)
+        ))
+
+    def groups(self, count):
+        start = Group.objects.count()
+        return self._insert(Group, (
+            Group(title=self.faker.catch_phrase()[:200], slug=f'group-{i}',
+                  description=self.faker.paragraph())
+            for i in range(start, start + count)
+        ))
+
+    def images(self, count, size=(1200, 800)):
+        """
+        Картинки JPEG из цветных прямоугольников в media/posts/.
+        Возвращает имена файлов; существующие файлы не пересоздаются.
+        """
+        names = []
+        for i in range(count):
+            name = f'posts/seed-{self.seed}-{i}.jpg'
+            if not default_storage.exists(name):
+                image = Image.new('RGB', size, self._color())
+                draw = ImageDraw.Draw(image)
+                for _ in range(12):
+                    x, y = (self.random.randrange(size[0]),
+                            self.random.randrange(size[1]))
+                    draw.rectangle((x, y, x + size[0] // 3, y + size[1] // 3),
+                                   fill=self._color())
+                buffer = BytesIO()
+                image.save(buffer, 'JPEG', quality=85)
+                name = default_storage.save(name, ContentFile(
+                    buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def _color(self):
+        return tuple(self.random.randrange(256) for _ in range(3))
+
+    def posts(self, count, group_share=0.5, images=(), image_share=0.3):
+        author_ids = list(User.objects.values_list('pk', flat=True))
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+        weights = self._power_law(len(author_ids))
+
+        def rows():
+            for _ in range(count):
+                author_id = self.random.choices(author_ids,
+                                                cum_weights=weights)[0]
+                group_id = None
+                if group_ids and self.random.random() < group_share:
+                    group_id = self.random.choice(group_ids)
+                text = self.faker.paragraph(
+                    nb_sentences=self.random.randint(1, 5))
+                image = ''
+                if images and self.random.random() < image_share:
+                    image = self.random.choice(images)
+                yield Post(author_id=author_id, group_id=group_id,
+                           text=text, pub_date=self._date(), image=image)
+
+        with manual_dates(Post, 'pub_date'):
+            return self._insert(Post, rows())
+
+    def comments(self, count):
+        author_ids = list(User.objects.values_list('pk', flat=True))
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        # Популярные посты разбросаны по всей ленте, а не только первые.
+        # Порядок зависит только от seed, чтобы у всех частей он совпадал
+        random.Random(self.seed).shuffle(post_ids)
+        weights = self._power_law(len(post_ids))
+        with manual_dates(Comment, 'created'):
+            return self._insert(Comment, (
+                Comment(author_id=self.random.choice(author_ids),
+                        post_id=self.random.choices(
+                            post_ids, cum_weights=weights)[0],
+                        text=self.faker.sentence(),
+                        created=self._date())
+                for _ in range(count)
+            ))
+
+    def follows(self, per_user=20):
+        """
+        Каждый пользователь подписывается в среднем на per_user авторов,
+        популярность автора убывает по степенному закону.
+        """
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        weights = self._power_law(len(user_ids))
+
+        def rows():
+            for user_id in user_ids:
+                size = min(len(user_ids) - 1,
+                           int(self.random.paretovariate(1.5) * per_user / 3))
+                authors = set(self.random.choices(
+                    user_ids, cum_weights=weights, k=size))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        before = Follow.objects.count()
+        self._insert(Follow, rows(), ignore_conflicts=True)
+        return Follow.objects.count() - before
+
+
+@contextmanager
+def manual_dates(model, field_name):
+    """ Отключает auto_now_add, чтобы bulk_create сохранил свои даты. """
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def enable_wal():
+    """
+    Включает WAL для SQLite: читатели не ждут пишущий процесс,
+    а запись не блокирует генерацию строк в других процессах.
+    Режим сохраняется в файле базы.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode = WAL')
+        return cursor.fetchone()[0]
+
+
+def can_fork():
+    """ Базу в памяти не видно из дочерних процессов. """
+    return not (connection.vendor == 'sqlite'
+                and connection.is_in_memory_db())
+
+
+def seed_part(task):
+    """ Часть постов или комментариев в дочернем процессе. """
+    method, seed, part, count, batch_size, options = task
+    try:
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        seeder = Seeder(seed, batch_size, part=part)
+        return getattr(seeder, method)(count, **options)
+    finally:
+        connections.close_all()
+
+
+def seed_parallel(method, count, workers, seed=0, batch_size=BATCH_SIZE,
+                  **options):
+    """
+    Делит count строк метода Seeder между workers процессами.
+    Соединения закрываются до fork, каждый процесс открывает свое.
+    """
+    tasks = [
+        (method, seed, part + 1,
+         count // workers + (part < count % workers), batch_size, options)
+        for part in range(workers)
+    ]
+    tasks = [task for task in tasks if task[3]]
+    if not tasks:
+        return 0
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(len(tasks)) as pool:
+        return sum(pool.map(seed_part, tasks))
+
+
+def finish_seeding():
+    """ Пересчет того, что обычно обновляют сигналы. """
+    recount_users()
+    recount_posts()
+    get_backend().rebuild()
+    cache.clear()
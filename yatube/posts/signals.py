@@ -0,0 +1,154 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.metrics import store as metrics
+
+from .caching import bump_feed_versions, bump_post_feeds, follow_scopes
+from .counters import change_comments_count, change_user_counters
+from .models import Comment, Follow, Group, Post, UserCounters
+from . import timelines
+from .search import get_backend
+
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """ Запоминает прежнюю группу, чтобы сбросить и ее ленту. """
+    if instance.pk is None:
+        return
+    instance._initial_group_id = (Post.objects
+                                  .filter(pk=instance.pk)
+                                  .values_list('group_id', flat=True)
+                                  .first())
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    bump_post_feeds(instance, getattr(instance, '_initial_group_id', None))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    bump_feed_versions('groups', f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_feeds(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login, ленты это не меняет
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_feed_versions('authors', f'profile:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, **kwargs):
+    bump_feed_versions(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    bump_feed_versions(*follow_scopes(instance.user_id, instance.author_id))
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_counters(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_user_counters(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_counters(instance.author_id, followers_count=1)
+        change_user_counters(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_user_counters(instance.author_id, followers_count=-1)
+    change_user_counters(instance.user_id, following_count=-1)
+
+
+# Ленты подписок проверяют счетчики подписчиков,
+# поэтому обработчики идут после count_*_follow
+@receiver(post_save, sender=Post)
+def fan_out_created_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and timelines.timelines_enabled():
+        timelines.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_deleted_post(sender, instance, **kwargs):
+    if timelines.timelines_enabled():
+        timelines.remove_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def add_followed_author(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and timelines.timelines_enabled():
+        timelines.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_unfollowed_author(sender, instance, **kwargs):
+    if not timelines.timelines_enabled():
+        return
+    timelines.remove_author(instance.user_id, instance.author_id)
+    followers = (UserCounters.objects
+                 .filter(user_id=instance.author_id)
+                 .values_list('followers_count', flat=True).first())
+    if followers == settings.FOLLOW_FANOUT_LIMIT:
+        timelines.push_author(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, update_fields=None, raw=False,
+                    **kwargs):
+    if raw or (update_fields and 'text' not in update_fields):
+        return
+    get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def count_created_objects(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.inc('yatube_objects_created_total',
+                    model=sender._meta.model_name)
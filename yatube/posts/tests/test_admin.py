@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post, Group, Comment
+from ..search import get_backend
+
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    """
+    Число запросов списков в админке не зависит
+    от количества строк, авторов и групп.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.post = Post.objects.create(author=cls.admin,
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(AdminChangelistTests.admin)
+
+    def add_data(self, size):
+        start = User.objects.count()
+        for i in range(start, start + size):
+            author = User.objects.create_user(username=f'author{i}')
+            group = Group.objects.create(title=f'Группа {i}',
+                                         slug=f'group-{i}')
+            post = Post.objects.create(author=author, group=group,
+                                       text=f'Тестовый пост {i}')
+            Comment.objects.create(author=author, post=post,
+                                   text=f'Тестовый комментарий {i}')
+
+    def assert_queries_stay(self, path, params=None):
+        counts = []
+        for size in (3, 12):
+            self.add_data(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(path, params)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_post_changelist_queries(self):
+        self.assert_queries_stay(reverse('admin:posts_post_changelist'))
+
+    def test_comment_changelist_queries(self):
+        self.assert_queries_stay(reverse('admin:posts_comment_changelist'))
+
+    def test_post_search_queries(self):
+        self.assert_queries_stay(reverse('admin:posts_post_changelist'),
+                                 {'q': 'Тестовый'})
+
+    def test_comment_author_search(self):
+        """ Проверка поиска комментариев по имени автора. """
+        self.add_data(3)
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'author2'})
+        self.assertEqual([comment.author.username for comment
+                          in response.context['cl'].result_list],
+                         ['author2'])
+
+    def test_post_search_uses_index(self):
+        """ Проверка, что поиск постов находит и по тексту, и по автору. """
+        self.add_data(3)
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'q': 'пост 2'})
+        self.assertEqual([post.text for post
+                          in response.context['cl'].result_list],
+                         ['Тестовый пост 2'])
+        response = self.client.get(url, {'q': 'author3'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    @override_settings(POST_SEARCH_MAX_RESULTS=2)
+    def test_post_search_is_not_capped(self):
+        """ Проверка, что админка находит все посты, а не первые N. """
+        self.add_data(3)
+        for backend in ('python', 'auto'):
+            with self.subTest(backend=backend), override_settings(
+                    POST_SEARCH_BACKEND=backend):
+                get_backend().rebuild()
+                response = self.client.get(
+                    reverse('admin:posts_post_changelist'),
+                    {'q': 'Тестовый'})
+                self.assertEqual(response.context['cl'].result_count, 4)
+
+    @override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_unfiltered_count_is_estimated(self):
+        """ Проверка, что список без фильтров не делает COUNT(*). """
+        self.add_data(3)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertFalse([query for query in queries
+                          if 'COUNT(*)' in query['sql']])
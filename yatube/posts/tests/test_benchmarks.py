@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from ..benchmarks import (VIEWS, TemplateBenchmark, compare_reports,
+                          percentile)
+from ..models import Post, Comment, Follow, UserCounters
+from ..search import search_post_ids
+
+
+User = get_user_model()
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_and_report(self):
+        """ Проверка заполнения базы и отчета на малом объеме. """
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command('benchmark_views', '--seed', '--users', '20',
+                         '--groups', '3', '--posts', '60', '--comments',
+                         '100', '--follows-per-user', '5',
+                         '--iterations', '5', '--output', output,
+                         stdout=StringIO())
+            with open(output) as file:
+                report = json.load(file)
+        self.assertEqual(set(report['views']), set(VIEWS))
+        for result in report['views'].values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries_min'], 0)
+        self.assertEqual(report['meta']['rows']['posts'], 60)
+        # Комментарии замера удаляются
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        author = Post.objects.first().author
+        self.assertEqual(UserCounters.objects.get(user=author).posts_count,
+                         author.posts.count())
+        self.assertTrue(search_post_ids(Post.objects.first().text))
+
+    def test_dates_are_spread(self):
+        """ Проверка, что bulk_create сохраняет сгенерированные даты. """
+        call_command('benchmark_views', '--seed', '--users', '5',
+                     '--groups', '0', '--posts', '20', '--comments', '0',
+                     '--iterations', '1', '--views', 'index',
+                     stdout=StringIO())
+        self.assertGreater(Post.objects.dates('pub_date', 'day').count(), 1)
+
+    def test_percentiles_and_compare(self):
+        """ Проверка перцентилей и сравнения отчетов. """
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        before = {'views': {'index': {'p50_ms': 10, 'p95_ms': 20,
+                                      'queries_mean': 4}}}
+        after = {'views': {'index': {'p50_ms': 5, 'p95_ms': 20,
+                                     'queries_mean': 4}}}
+        self.assertIn('p50_ms 10 -> 5 (-50.0%)',
+                      compare_reports(before, after)[0])
+
+    def test_template_benchmark(self):
+        """ Оба варианта загрузчиков рендерят одну и ту же страницу. """
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}') for i in range(3))
+        benchmark = TemplateBenchmark()
+        default = benchmark.render(benchmark.engine(cached=False))
+        self.assertIn('Пост 2', default)
+        self.assertEqual(benchmark.render(benchmark.engine(cached=True)),
+                         default)
+        report = benchmark.run(iterations=2)
+        self.assertEqual(report['meta']['posts'], 3)
+        self.assertEqual(set(report['loaders']), {'default', 'cached'})
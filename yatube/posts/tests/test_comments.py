@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post
+
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.other = Post.objects.create(author=cls.user, text='Другой')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(7)
+        )
+        # Одинаковое время у всех: порядок держится на pk
+        Comment.objects.filter(post=cls.post).update(created=timezone.now())
+        Comment.objects.create(post=cls.other, author=cls.user,
+                               text='Чужой')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_first_page_on_post_detail(self):
+        """ Проверка, что на странице поста только первая страница. """
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        comments = response.context['comments']
+        self.assertEqual([comment.text for comment in comments],
+                         ['Комментарий 6', 'Комментарий 5', 'Комментарий 4'])
+        self.assertContains(response, 'data-more-comments')
+        self.assertContains(
+            response, reverse('posts:post_comments', args=[self.post.pk])
+            + f'?after={comments.next_cursor}')
+
+    def test_fragments_load_all_comments(self):
+        """ Проверка догрузки фрагментами до конца без повторов. """
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        texts, after = [], ''
+        for _ in range(3):
+            with self.assertNumQueries(2):
+                response = self.client.get(url, {'after': after})
+            comments = response.context['comments']
+            texts += [comment.text for comment in comments]
+            after = comments.next_cursor
+        self.assertEqual(texts, [f'Комментарий {i}' for i in range(6, -1, -1)])
+        self.assertIsNone(after)
+        self.assertNotContains(response, 'data-more-comments')
+        self.assertTemplateNotUsed(response, 'base.html')
+
+    def test_json(self):
+        """ Проверка ответа JSON и битого курсора. """
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), 3)
+        self.assertEqual(data['comments'][0]['author'], 'author')
+        data = self.client.get(
+            url, {'format': 'json', 'after': data['next']}).json()
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий 3')
+        data = self.client.get(url, {'format': 'json',
+                                     'after': 'битый'}).json()
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий 6')
+        self.assertEqual(
+            self.client.get(reverse('posts:post_comments',
+                                    args=[0])).status_code, 404)
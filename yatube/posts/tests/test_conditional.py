@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Ленты и страница поста отдают ETag и отвечают 304
+    без рендера шаблона, пока их содержимое не изменилось.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост'
+        )
+        cls.pages = {
+            reverse('posts:index'): 0,
+            reverse('posts:group_list',
+                    kwargs={'slug': cls.group.slug}): 1,
+            reverse('posts:profile',
+                    kwargs={'username': cls.user.username}): 1,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': cls.post.id}): 1,
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def etag(self, path, client=None):
+        response = (client or self.client).get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified_without_render(self):
+        """ Повтор с If-None-Match: 304, шаблон не рендерится. """
+        for path, queries in ConditionalGetTests.pages.items():
+            with self.subTest(path=path):
+                etag = self.etag(path)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(path,
+                                               HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                self.assertEqual(response.content, b'')
+
+    def test_missing_object_is_not_found(self):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            HTTP_IF_NONE_MATCH='"missing"')
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_depends_on_reader(self):
+        """ Шапка и кнопки разные у читателей — и ETag тоже. """
+        client = Client()
+        client.force_login(ConditionalGetTests.reader)
+        for path in ConditionalGetTests.pages:
+            with self.subTest(path=path):
+                self.assertNotEqual(self.etag(path),
+                                    self.etag(path, client))
+
+    def test_etag_changes_with_content(self):
+        """ Новые пост, комментарий и подписка меняют ETag страниц. """
+        user = ConditionalGetTests.user
+        post = ConditionalGetTests.post
+
+        def rename():
+            author = User.objects.get(pk=user.pk)
+            author.first_name = 'Новое имя'
+            author.save()
+
+        changes = {
+            'Новый пост': lambda: Post.objects.create(
+                author=user, group=ConditionalGetTests.group,
+                text='Еще пост'),
+            'Комментарий': lambda: Comment.objects.create(
+                author=user, post=post, text='Комментарий'),
+            'Подписка': lambda: Follow.objects.create(
+                user=ConditionalGetTests.reader, author=user),
+            'Новое имя автора': rename,
+        }
+        affected = {
+            'Новый пост': list(ConditionalGetTests.pages),
+            'Комментарий': [reverse('posts:post_detail',
+                                    kwargs={'post_id': post.id})],
+            'Подписка': [reverse('posts:profile',
+                                 kwargs={'username': user.username})],
+            'Новое имя автора': list(ConditionalGetTests.pages),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                before = {path: self.etag(path) for path in affected[name]}
+                change()
+                for path, etag in before.items():
+                    self.assertNotEqual(self.etag(path), etag, path)
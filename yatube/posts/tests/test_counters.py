@@ -0,0 +1,100 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post, UserCounters
+
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+        cls.author = User.objects.create_user(username='testierboy')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(CountersTests.user)
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """ Проверка счетчиков постов и комментариев. """
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Тест счетчика'})
+        post = Post.objects.get(text='Тест счетчика')
+        self.assertEqual(self.counters(CountersTests.user).posts_count, 1)
+        self.client.post(reverse('posts:add_comment',
+                                 kwargs={'post_id': post.id}),
+                         {'text': 'Тестовый комментарий'})
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        post.comments.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.counters(CountersTests.user).posts_count, 0)
+
+    def test_follow_counters(self):
+        """ Проверка счетчиков подписчиков и подписок. """
+        username_param = {'username': CountersTests.author.username}
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs=username_param))
+        self.assertEqual(
+            self.counters(CountersTests.author).followers_count, 1)
+        self.assertEqual(
+            self.counters(CountersTests.user).following_count, 1)
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs=username_param))
+        self.assertEqual(
+            self.counters(CountersTests.author).followers_count, 0)
+        self.assertEqual(
+            self.counters(CountersTests.user).following_count, 0)
+
+    def test_drifted_counters_stay_non_negative(self):
+        """ Уменьшение обнуленного счетчика не уводит его в минус. """
+        username_param = {'username': CountersTests.author.username}
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs=username_param))
+        post = Post.objects.create(author=CountersTests.author,
+                                   text='Тестовый пост')
+        post.comments.create(author=CountersTests.user,
+                             text='Тестовый комментарий')
+        UserCounters.objects.update(followers_count=0, following_count=0)
+        Post.objects.update(comments_count=0)
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs=username_param))
+        post.comments.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            self.counters(CountersTests.author).followers_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """ Проверка, что recount чинит разошедшиеся счетчики. """
+        Post.objects.bulk_create(
+            Post(author=CountersTests.author, text=f'Тестовый пост {i}')
+            for i in range(3)
+        )
+        UserCounters.objects.filter(user=CountersTests.user).delete()
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.counters(CountersTests.author).posts_count, 3)
+        self.assertEqual(self.counters(CountersTests.user).posts_count, 0)
+
+    def test_detail_page_has_no_aggregates(self):
+        """ Проверка, что страница поста не считает посты автора. """
+        post = Post.objects.create(author=CountersTests.author,
+                                   text='Тестовый пост')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:post_detail',
+                                               kwargs={'post_id': post.id}))
+        self.assertEqual(response.context['num_posts'], 1)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
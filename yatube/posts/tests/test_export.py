@@ -0,0 +1,95 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.staff = User.objects.create_user(username='staff',
+                                             is_staff=True)
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {i}',
+                                group=cls.group if i % 2 else None)
+            for i in range(3)
+        ]
+        # Даты по порядку создания с разницей в час
+        start = timezone.now() - timedelta(days=1)
+        for i, post in enumerate(cls.posts):
+            post.pub_date = start + timedelta(hours=i)
+            post.save(update_fields=['pub_date'])
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('export_posts', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_ndjson_since_watermark(self):
+        """ Проверка NDJSON и инкрементальной выгрузки по отметке. """
+        out, err = self.export()
+        rows = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [post.pk for post in self.posts])
+        self.assertEqual(rows[1]['author'], 'author')
+        self.assertEqual(rows[1]['group'], 'group')
+        self.assertIsNone(rows[0]['group'])
+        watermark = err.split('Отметка для --since: ')[1].strip()
+        self.assertEqual(watermark, rows[-1]['pub_date'])
+        out, _ = self.export('--since', rows[0]['pub_date'])
+        self.assertEqual(len(out.splitlines()), 2)
+        out, _ = self.export('--since', watermark)
+        self.assertEqual(out, '')
+
+    def test_csv_datasets(self):
+        """ Проверка CSV для комментариев, групп и подписок. """
+        out, _ = self.export('comments', '--format', 'csv')
+        rows = list(csv.DictReader(StringIO(out)))
+        self.assertEqual(rows[0]['post'], str(self.posts[0].pk))
+        self.assertEqual(rows[0]['author'], 'reader')
+        out, _ = self.export('follows', '--format', 'csv')
+        self.assertEqual(out.splitlines()[1].split(',')[1:],
+                         ['reader', 'author'])
+        out, _ = self.export('groups', '--format', 'csv',
+                             '--chunk-size', '1')
+        self.assertIn('group,Группа', out)
+
+    def test_view_is_staff_only(self):
+        """ Проверка доступа к выгрузке и потокового ответа. """
+        url = reverse('posts:export', args=['posts'])
+        client = Client()
+        client.force_login(self.reader)
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(self.staff)
+        response = client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(body.splitlines()), 4)
+        self.assertEqual(client.get(url, {'since': 'вчера'}).status_code,
+                         400)
+        self.assertEqual(
+            client.get(reverse('posts:export', args=['groups']),
+                       {'since': '2020-01-01'}).status_code, 400)
+        self.assertEqual(
+            client.get(reverse('posts:export', args=['users'])).status_code,
+            404)
@@ -1,11 +1,15 @@
 import tempfile
+from io import BytesIO
 import shutil
 from django.conf import settings
 from django.test import TestCase, Client, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from PIL import Image
 from django.urls import reverse
+from ..forms import PostForm
+from ..images import EXTENSIONS, output_format
 from ..models import Post, Group, Comment
 
 
@@ -69,7 +73,7 @@ class PostsFormTests(TestCase):
                 text='Тест создания поста',
                 group=PostsFormTests.group,
                 author=PostsFormTests.user,
-                image='posts/test.gif'
+                image=f'posts/test.{EXTENSIONS[output_format()]}'
             ).exists()
         )
 
@@ -108,7 +112,7 @@ class PostsFormTests(TestCase):
                 text='Тест изменения поста',
                 group=PostsFormTests.group,
                 author=PostsFormTests.user,
-                image='posts/test2.gif'
+                image=f'posts/test2.{EXTENSIONS[output_format()]}'
             ).exists()
         )
 
@@ -137,3 +141,73 @@ class PostsFormTests(TestCase):
                 post=PostsFormTests.post
             ).exists()
         )
+
+
+def make_upload(name='big.jpg', size=(3000, 1000), image_format='JPEG',
+                **options):
+    buffer = BytesIO()
+    image = Image.new('RGB', size, (200, 10, 10))
+    image.save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_image_is_downscaled_and_stripped(self):
+        """ Проверка, что картинка уменьшается и теряет EXIF. """
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        form = PostForm({'text': 'Тест'},
+                        {'image': make_upload(exif=exif.tobytes())})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(max(image.size), settings.POST_IMAGE_MAX_SIDE)
+        self.assertEqual(image.format, output_format())
+        self.assertNotIn('exif', image.info)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels_are_rejected(self):
+        """ Проверка, что слишком большая картинка не проходит форму. """
+        form = PostForm({'text': 'Тест'},
+                        {'image': make_upload(size=(100, 100))})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_large_file_is_rejected(self):
+        """ Проверка ограничения размера файла. """
+        form = PostForm({'text': 'Тест'},
+                        {'image': make_upload(size=(100, 100))})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'file_too_large')
+
+    def test_transparent_image_keeps_alpha(self):
+        """ Проверка, что прозрачность не теряется при JPEG. """
+        buffer = BytesIO()
+        Image.new('RGBA', (10, 10), (0, 0, 0, 0)).save(buffer, 'PNG')
+        upload = SimpleUploadedFile('alpha.png', buffer.getvalue())
+        form = PostForm({'text': 'Тест'}, {'image': upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.mode, 'RGBA')
+
+    @override_settings(POST_IMAGE_KEEP_ORIGINALS=True)
+    def test_original_is_kept(self):
+        """ Проверка, что исходник сохраняется по настройке. """
+        user = User.objects.create_user(username='keeper')
+        form = PostForm({'text': 'Тест'}, {'image': make_upload()})
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = user
+        post.save()
+        self.assertTrue(post.original_image.name.startswith(
+            'posts/originals/big'))
+        self.assertEqual(Image.open(post.original_image).size, (3000, 1000))
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Group, ImportJob, Post, UserCounters
+from .test_thumbnails import SMALL_GIF
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT,
+                                                       'kvstore.sqlite3'))
+class ImportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {i}',
+                                group=cls.group)
+            for i in range(3)
+        ]
+        Comment.objects.create(post=cls.posts[1], author=cls.author,
+                               text='Комментарий')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name, lines=None):
+        path = os.path.join(self.directory, name)
+        if lines is not None:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.writelines(line + '\n' for line in lines)
+        return path
+
+    def export(self, dataset, name):
+        call_command('export_posts', dataset, '--output', self.path(name),
+                     '--format', name.split('.')[-1], stderr=StringIO())
+        return self.path(name)
+
+    def load(self, *args):
+        out = StringIO()
+        call_command('import_posts', *args, '--batch-size', '2',
+                     '--workers', '1', stdout=out)
+        return out.getvalue()
+
+    def test_posts_and_comments_round_trip(self):
+        """ Проверка загрузки выгрузки со сдвигом ключей. """
+        posts = self.export('posts', 'posts.ndjson')
+        comments = self.export('comments', 'comments.csv')
+        with self.assertRaises(CommandError):
+            self.load('comments', comments, '--source', 'other')
+        self.load('posts', posts)
+        self.load('comments', comments)
+        offset = ImportJob.objects.get(dataset='posts').id_offset
+        self.assertEqual(offset, self.posts[-1].pk)
+        copy = Post.objects.get(pk=offset + self.posts[1].pk)
+        self.assertEqual(copy.text, self.posts[1].text)
+        self.assertEqual(copy.pub_date, self.posts[1].pub_date)
+        self.assertEqual(copy.group, self.group)
+        self.assertEqual(copy.comments.get().text, 'Комментарий')
+        self.assertEqual(copy.comments_count, 1)
+        self.assertEqual(UserCounters.objects.get(user=self.author)
+                         .posts_count, 6)
+        # Повторный запуск ничего не добавляет
+        self.load('posts', posts)
+        self.assertEqual(Post.objects.count(), 6)
+
+    def test_resume_after_failure(self):
+        """ Проверка продолжения загрузки после ошибки в файле. """
+        rows = [json.dumps({'id': i, 'author': 'author', 'group': None,
+                            'text': f'Запись {i}',
+                            'pub_date': '2020-01-0{}T10:00:00'.format(i)})
+                for i in range(1, 6)]
+        path = self.path('broken.ndjson', rows[:3] + ['{'] + rows[3:])
+        with self.assertRaisesMessage(CommandError, 'записи 2'):
+            self.load('posts', path, '--source', 'broken')
+        self.assertEqual(Post.objects.filter(text__startswith='Запись')
+                         .count(), 2)
+        self.path('broken.ndjson', rows[:3] + ['{}'] + rows[3:])
+        with self.assertRaises(CommandError):
+            self.load('posts', path, '--source', 'broken')
+        self.path('broken.ndjson', rows)
+        output = self.load('posts', path, '--source', 'broken')
+        self.assertIn('Продолжение с записи 2', output)
+        self.assertEqual(Post.objects.filter(text__startswith='Запись')
+                         .count(), 5)
+
+    def test_missing_authors_and_images(self):
+        """ Проверка неизвестных авторов, групп и копирования картинок. """
+        media_dir = self.path('media')
+        os.makedirs(os.path.join(media_dir, 'posts'))
+        with open(os.path.join(media_dir, 'posts', 'small.gif'), 'wb') as f:
+            f.write(SMALL_GIF)
+        rows = [json.dumps({'id': 1, 'author': 'stranger', 'group': 'new',
+                            'text': 'Чужой', 'image': 'posts/small.gif',
+                            'pub_date': '2020-01-01'}),
+                json.dumps({'id': 2, 'author': 'author', 'group': None,
+                            'text': 'Свой', 'image': '../../secret',
+                            'pub_date': '2020-01-01'})]
+        path = self.path('posts.ndjson', rows)
+        output = self.load('posts', path, '--source', 'skip')
+        self.assertIn('пропущено: 1', output)
+        self.assertEqual(Post.objects.get(text='Свой').image, '')
+        self.load('posts', path, '--source', 'create', '--create-missing',
+                  '--media-dir', media_dir)
+        post = Post.objects.get(text='Чужой')
+        self.assertEqual(post.author.username, 'stranger')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.group.slug, 'new')
+        self.assertTrue(default_storage.exists('posts/small.gif'))
+        self.assertTrue(post.thumbnail)
@@ -0,0 +1,135 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..caching import get_feed_versions
+from ..models import Post, Group, Comment, Follow, SearchTerm, UserCounters
+from ..search import search_post_ids
+from .. import moderation
+
+
+User = get_user_model()
+
+
+@override_settings(MODERATION_BATCH_SIZE=2)
+class ModerationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test-slug')
+        cls.other_group = Group.objects.create(title='Другая группа',
+                                               slug='other-slug')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(ModerationTests.admin)
+        self.posts = [
+            Post.objects.create(author=self.spammer, group=self.group,
+                                text=f'Спам {i}')
+            for i in range(5)
+        ]
+        self.kept = Post.objects.create(author=self.reader, text='Пост')
+        for post in (*self.posts, self.kept):
+            Comment.objects.create(author=self.reader, post=post,
+                                   text='Комментарий')
+        Comment.objects.create(author=self.spammer, post=self.kept,
+                               text='Спам')
+        Follow.objects.create(user=self.reader, author=self.spammer)
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_delete_posts(self):
+        """ Проверка пакетного удаления постов. """
+        versions = get_feed_versions(['index', f'group:{self.group.pk}'])
+        deleted = moderation.delete_posts(
+            Post.objects.filter(author=self.spammer))
+        self.assertEqual(deleted, 5)
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(self.counters(self.spammer).posts_count, 0)
+        self.assertEqual(search_post_ids('спам'), [])
+        self.assertFalse(SearchTerm.objects.filter(
+            post_id__in=[post.pk for post in self.posts]).exists())
+        self.assertNotEqual(
+            get_feed_versions(['index', f'group:{self.group.pk}']),
+            versions)
+
+    def test_delete_queries_do_not_grow(self):
+        """ Проверка, что запросов столько же, сколько пачек. """
+        with CaptureQueriesContext(connection) as few:
+            moderation.delete_posts(Post.objects.filter(pk=self.kept.pk))
+        with CaptureQueriesContext(connection) as many:
+            moderation.delete_posts(
+                Post.objects.filter(pk__in=[post.pk
+                                            for post in self.posts[:2]]))
+        self.assertEqual(len(few), len(many))
+
+    @override_settings(POST_SEARCH_BACKEND='python')
+    def test_search_terms_deleted_once(self):
+        """ Проверка, что индекс 'python' чистится одним запросом. """
+        with CaptureQueriesContext(connection) as queries:
+            moderation.delete_posts(Post.objects.filter(pk=self.kept.pk))
+        self.assertEqual(len([
+            query for query in queries
+            if query['sql'].startswith('DELETE FROM "posts_searchterm"')
+        ]), 1)
+
+    def test_regroup_posts(self):
+        """ Проверка переноса постов в другую группу. """
+        versions = get_feed_versions([f'group:{self.group.pk}',
+                                      f'group:{self.other_group.pk}'])
+        moved = moderation.regroup_posts(Post.objects.filter(
+            group=self.group), self.other_group)
+        self.assertEqual(moved, 5)
+        self.assertEqual(self.other_group.posts.count(), 5)
+        new_versions = get_feed_versions([f'group:{self.group.pk}',
+                                          f'group:{self.other_group.pk}'])
+        self.assertNotEqual(versions[0], new_versions[0])
+        self.assertNotEqual(versions[1], new_versions[1])
+
+    def test_delete_comments(self):
+        """ Проверка удаления комментариев и их счетчика у поста. """
+        moderation.delete_comments(Comment.objects.filter(post=self.kept))
+        self.kept.refresh_from_db()
+        self.assertEqual(self.kept.comments_count, 0)
+
+    def test_purge_authors(self):
+        """ Проверка удаления всего, что написал автор. """
+        result = moderation.purge_authors([self.spammer.pk])
+        self.assertEqual(result, {'users': 1, 'posts': 5, 'comments': 1})
+        self.spammer.refresh_from_db()
+        self.assertFalse(self.spammer.is_active)
+        self.kept.refresh_from_db()
+        self.assertEqual(self.kept.comments_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+        self.assertEqual(self.counters(self.spammer).followers_count, 0)
+
+    def test_admin_actions(self):
+        """ Проверка действий в списке постов админки. """
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.post(url, {
+            'action': 'regroup_posts',
+            '_selected_action': [self.posts[0].pk],
+            'group': self.other_group.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].group, self.other_group)
+        self.client.post(url, {
+            'action': 'delete_posts',
+            '_selected_action': [self.posts[1].pk],
+        })
+        self.assertFalse(Post.objects.filter(pk=self.posts[1].pk).exists())
+        response = self.client.get(url)
+        self.assertNotIn('delete_selected',
+                         dict(response.context['action_form']
+                              .fields['action'].choices))
@@ -0,0 +1,171 @@
+from unittest import skipUnless
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.conf import settings
+from django.test import TestCase, Client, RequestFactory
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from core.pagecache import cache_shared_page, mark_fragment
+from ..caching import FEED_VERSION_KEY, INDEX_SCOPES
+from ..models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    """
+    Анонимам страница отдается из кэша целиком, вошедшим
+    пользователям — общая часть из кэша и их собственные фрагменты.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='testboy')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Тестовый пост'
+        )
+        cls.profile_url = reverse('posts:profile',
+                                  kwargs={'username': cls.author.username})
+        cls.post_url = reverse('posts:post_detail',
+                               kwargs={'post_id': cls.post.id})
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(PageCacheTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(PageCacheTests.reader)
+
+    def test_anonymous_page_is_cached(self):
+        """ Повтор анонимного запроса — без запросов к базе и шаблонов. """
+        url = reverse('posts:index')
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(second.templates, [])
+        self.assertEqual(second.content, first.content)
+
+    def test_unknown_query_params_share_page(self):
+        """ Параметры, которые страница не читает, не плодят записи. """
+        url = reverse('posts:index')
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url, {'utm_source': 'test'})
+        self.assertEqual(second.content, first.content)
+        self.assertNotEqual(
+            self.guest_client.get(url, {'page': 2}).templates, [])
+
+    def test_cached_page_keeps_headers(self):
+        """ Ответ из кэша отдается с заголовками исходного ответа. """
+        def view(request):
+            response = HttpResponse('Страница')
+            response['Vary'] = 'Accept-Language'
+            return response
+
+        cached_view = cache_shared_page(lambda request: 'v1')(view)
+        for user in (AnonymousUser(), PageCacheTests.reader):
+            with self.subTest(user=user):
+                request = RequestFactory().get('/page/')
+                request.user = user
+                cached_view(request)
+                response = cached_view(request)
+                self.assertEqual(response['Vary'], 'Accept-Language')
+                self.assertEqual(response.content.decode(), 'Страница')
+
+    def test_fragment_values_are_not_models(self):
+        """ Объекты моделей не попадают в общий кэш фрагментов. """
+        with self.assertRaises(TypeError):
+            mark_fragment(None, 'fragment.html',
+                          {'post': PageCacheTests.post}, '')
+
+    def test_user_fragments_are_rendered_per_reader(self):
+        """ Шапка и кнопка подписки не переходят к другому читателю. """
+        Follow.objects.create(user=PageCacheTests.reader,
+                              author=PageCacheTests.author)
+        self.author_client.get(PageCacheTests.profile_url)
+        response = self.reader_client.get(PageCacheTests.profile_url)
+        self.assertNotIn('posts/profile.html',
+                         [template.name for template in response.templates])
+        content = response.content.decode()
+        self.assertIn('Пользователь: reader', content)
+        self.assertNotIn('Пользователь: testboy', content)
+        self.assertIn('Отписаться', content)
+        content = self.guest_client.get(
+            PageCacheTests.profile_url).content.decode()
+        self.assertIn('Войти', content)
+        self.assertIn('Подписаться', content)
+
+    def test_cached_page_matches_rendered(self):
+        """ Собранная из кэша страница совпадает с отрендеренной. """
+        first = self.reader_client.get(PageCacheTests.profile_url)
+        second = self.reader_client.get(PageCacheTests.profile_url)
+        self.assertEqual(second.content, first.content)
+
+    def test_post_detail_fragments(self):
+        """ Форма комментария и кнопка правки — только своим читателям. """
+        self.guest_client.get(PageCacheTests.post_url)
+        edit_url = reverse('posts:post_edit',
+                           kwargs={'post_id': PageCacheTests.post.id})
+        content = self.author_client.get(
+            PageCacheTests.post_url).content.decode()
+        self.assertIn(edit_url, content)
+        self.assertIn('csrfmiddlewaretoken', content)
+        content = self.reader_client.get(
+            PageCacheTests.post_url).content.decode()
+        self.assertNotIn(edit_url, content)
+        self.assertIn('Добавить комментарий', content)
+        content = self.guest_client.get(
+            PageCacheTests.post_url).content.decode()
+        self.assertNotIn('Добавить комментарий', content)
+
+    def test_writes_invalidate_pages(self):
+        """ Пост, комментарий и подписка сбрасывают кэш своих страниц. """
+        changes = (
+            (reverse('posts:index'), 'Новый пост',
+             lambda: Post.objects.create(author=PageCacheTests.author,
+                                         text='Новый пост')),
+            (PageCacheTests.post_url, 'Новый комментарий',
+             lambda: Comment.objects.create(author=PageCacheTests.reader,
+                                            post=PageCacheTests.post,
+                                            text='Новый комментарий')),
+            (PageCacheTests.profile_url, 'Подписчиков: 1',
+             lambda: Follow.objects.create(user=PageCacheTests.reader,
+                                           author=PageCacheTests.author)),
+        )
+        for url, text, change in changes:
+            with self.subTest(url=url):
+                self.assertNotContains(self.guest_client.get(url), text)
+                change()
+                self.assertContains(self.guest_client.get(url), text)
+
+    @skipUnless(settings.SHARED_CACHE_PER_PROCESS, 'общий кэш')
+    def test_per_process_cache_expires_versions(self):
+        """
+        С locmem у каждого процесса свои версии лент, поэтому они
+        истекают и правка из другого процесса видна не позже TTL.
+        """
+        self.assertIsNotNone(settings.FEED_VERSION_TIMEOUT)
+        self.assertLessEqual(settings.PAGE_CACHE_TIMEOUT,
+                             settings.FEED_VERSION_TIMEOUT)
+        index_url = reverse('posts:index')
+        self.assertContains(self.guest_client.get(index_url), 'Тестовый пост')
+        # Правка другого процесса: сигналы здесь не срабатывают.
+        Post.objects.filter(pk=PageCacheTests.post.pk).update(
+            text='Правка из другого процесса')
+        self.assertContains(self.guest_client.get(index_url), 'Тестовый пост')
+        # Истечение FEED_VERSION_TIMEOUT.
+        cache.delete_many(
+            [FEED_VERSION_KEY.format(scope) for scope in INDEX_SCOPES])
+        self.assertContains(self.guest_client.get(index_url),
+                            'Правка из другого процесса')
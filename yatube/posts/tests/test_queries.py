@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post, Group, Comment, Follow
+
+
+User = get_user_model()
+
+
+class ViewQueryCountTests(TestCase):
+    """
+    Число запросов каждой страницы не зависит от количества
+    постов, комментариев и авторов на ней.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ViewQueryCountTests.user)
+
+    def add_data(self, size):
+        """ Посты и комментарии от size новых авторов. """
+        start = User.objects.count()
+        for i in range(start, start + size):
+            author = User.objects.create_user(username=f'author{i}')
+            Follow.objects.create(user=ViewQueryCountTests.user,
+                                  author=author)
+            Post.objects.create(author=author,
+                                group=ViewQueryCountTests.group,
+                                text=f'Тестовый пост {i}')
+            Comment.objects.create(author=author,
+                                   post=ViewQueryCountTests.post,
+                                   text=f'Тестовый комментарий {i}')
+
+    def assert_queries_stay(self, expected, path):
+        for size in (3, 12):
+            self.add_data(size)
+            cache.clear()
+            with self.subTest(size=size), self.assertNumQueries(expected):
+                self.client.get(path)
+
+    def test_index_queries(self):
+        self.assert_queries_stay(4, reverse('posts:index'))
+
+    def test_group_posts_queries(self):
+        self.assert_queries_stay(
+            5, reverse('posts:group_list',
+                       kwargs={'slug': ViewQueryCountTests.group.slug}))
+
+    def test_profile_queries(self):
+        self.assert_queries_stay(
+            6, reverse('posts:profile',
+                       kwargs={'username': ViewQueryCountTests.user.username}))
+
+    def test_post_detail_queries(self):
+        self.assert_queries_stay(
+            4, reverse('posts:post_detail',
+                       kwargs={'post_id': ViewQueryCountTests.post.id}))
+
+    def test_follow_index_queries(self):
+        self.assert_queries_stay(4, reverse('posts:follow_index'))
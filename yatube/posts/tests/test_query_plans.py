@@ -0,0 +1,83 @@
+import re
+from unittest import skipUnless
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post, Group, Comment, Follow
+
+
+User = get_user_model()
+FEED_TABLES = ('posts_post', 'posts_comment', 'posts_follow')
+# Полный проход по таблице без индекса: "SCAN posts_post"
+# или "SCAN TABLE posts_post" в старых версиях SQLite
+FULL_SCAN = re.compile(r'SCAN (TABLE )?(?P<table>\w+)(?!\w| USING)')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса проверяется '
+                                           'только на SQLite')
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+        cls.author = User.objects.create_user(username='testierboy')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        posts = (Post(text=f'Тестовый пост {i}',
+                      group=cls.group,
+                      author=(cls.user, cls.author)[i % 2])
+                 for i in range(30))
+        Post.objects.bulk_create(posts)
+        cls.post = Post.objects.filter(author=cls.author).first()
+        comments = (Comment(text=f'Тестовый комментарий {i}',
+                            post=cls.post,
+                            author=cls.user) for i in range(15))
+        Comment.objects.bulk_create(comments)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(FeedQueryPlanTests.user)
+
+    def full_scans(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(path)
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    match = FULL_SCAN.search(row[-1])
+                    if match and match.group('table') in FEED_TABLES:
+                        scans.append((sql, row[-1]))
+        return scans
+
+    def test_feed_views_use_indexes(self):
+        """ Проверка, что ленты не читают таблицы постов целиком. """
+        paths = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': FeedQueryPlanTests.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': FeedQueryPlanTests.author.username}),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': FeedQueryPlanTests.post.id}),
+            reverse('posts:follow_index'),
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(self.full_scans(path), [])
+
+    def test_follow_pair_is_unique(self):
+        """ Проверка, что повторная подписка отклоняется базой. """
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=FeedQueryPlanTests.user,
+                                  author=FeedQueryPlanTests.author)
@@ -0,0 +1,81 @@
+from io import StringIO
+from urllib.parse import urlencode
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post, SearchTerm
+from ..search import fts5_available, search_post_ids, tokenize
+
+
+User = get_user_model()
+
+
+class SearchMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+        cls.first = Post.objects.create(author=cls.user,
+                                        text='Кот сидит на окне')
+        cls.second = Post.objects.create(
+            author=cls.user, text='Кот, кот и еще раз кот: про котов')
+        cls.third = Post.objects.create(author=cls.user,
+                                        text='Собака лежит на ковре')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_ranked_results(self):
+        """ Проверка, что чаще упомянутое слово ранжируется выше. """
+        self.assertEqual(search_post_ids('кот'),
+                         [self.second.id, self.first.id])
+
+    def test_all_words_required(self):
+        """ Проверка, что пост должен содержать все слова запроса. """
+        self.assertEqual(search_post_ids('кот окне'), [self.first.id])
+        self.assertEqual(search_post_ids('кот собака'), [])
+        self.assertEqual(search_post_ids('"*: ()'), [])
+
+    def test_index_follows_signals(self):
+        """ Проверка, что индекс обновляется при правке и удалении. """
+        post = Post.objects.create(author=self.user, text='Попугай')
+        self.assertEqual(search_post_ids('попугай'), [post.id])
+        post.text = 'Хомяк'
+        post.save()
+        self.assertEqual(search_post_ids('попугай'), [])
+        self.assertEqual(search_post_ids('хомяк'), [post.id])
+        post.delete()
+        self.assertEqual(search_post_ids('хомяк'), [])
+
+    def test_rebuild_command(self):
+        """ Проверка, что команда восстанавливает индекс. """
+        Post.objects.bulk_create([Post(author=self.user, text='Енот')])
+        self.assertEqual(search_post_ids('енот'), [])
+        call_command('rebuild_search', stdout=StringIO())
+        self.assertEqual(len(search_post_ids('енот')), 1)
+
+    def test_search_page(self):
+        """ Проверка страницы поиска и ссылок паджинатора. """
+        response = self.client.get(reverse('posts:search'), {'q': 'Кот'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.second, self.first])
+        self.assertEqual(response.context['page_query'],
+                         urlencode({'q': 'Кот'}) + '&')
+
+
+@override_settings(POST_SEARCH_BACKEND='fts5')
+class FTS5SearchTests(SearchMixin, TestCase):
+    def test_table_is_created(self):
+        """ Проверка, что миграция создала таблицу FTS5. """
+        self.assertTrue(fts5_available())
+
+
+@override_settings(POST_SEARCH_BACKEND='python')
+class TermIndexSearchTests(SearchMixin, TestCase):
+    def test_terms_are_counted(self):
+        """ Проверка записей обратного индекса. """
+        self.assertEqual(
+            SearchTerm.objects.get(post=self.second, term='кот').count, 3)
+        self.assertEqual(tokenize('Про_котов, ПРО!'),
+                         ['про', 'котов', 'про'])
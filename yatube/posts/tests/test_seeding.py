@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Group, Post, UserCounters
+from ..seeding import Seeder
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_with_images(self):
+        """ Проверка заполнения базы и вывода скорости вставки. """
+        out = StringIO()
+        call_command('seed_yatube', '--users', '10', '--groups', '2',
+                     '--posts', '40', '--comments', '50', '--images', '2',
+                     '--image-share', '1', '--workers', '4',
+                     '--batch-size', '7', stdout=out, stderr=StringIO())
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertEqual(Post.objects.filter(image='').count(), 0)
+        self.assertEqual(
+            Post.objects.values('image').distinct().count(), 2)
+        author = Post.objects.first().author
+        self.assertEqual(UserCounters.objects.get(user=author).posts_count,
+                         author.posts.count())
+        self.assertIn('строк/с', out.getvalue())
+
+    def test_parts_are_deterministic(self):
+        """ Проверка, что seed и номер части задают одни и те же данные. """
+        texts = [
+            Seeder(1, part=part).faker.paragraph() for part in (0, 1, 1)
+        ]
+        self.assertNotEqual(texts[0], texts[1])
+        self.assertEqual(texts[1], texts[2])
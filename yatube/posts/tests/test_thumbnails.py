@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import shutil
+from io import StringIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post
+from ..thumbnails import (generate_post_thumbnail, variant_formats,
+                          variant_widths)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False,
+                   THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT,
+                                                       'kvstore.sqlite3'))
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ThumbnailTests.user)
+
+    def test_thumbnail_is_made_on_create(self):
+        """ Проверка, что миниатюра готова после создания поста. """
+        image = SimpleUploadedFile(name='thumb.gif', content=SMALL_GIF,
+                                   content_type='image/gif')
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Тест миниатюры', 'image': image})
+        post = Post.objects.get(text='Тест миниатюры')
+        self.assertTrue(post.thumbnail.startswith('cache/'))
+        response = self.client.get(reverse('posts:post_detail',
+                                           kwargs={'post_id': post.id}))
+        self.assertContains(response, post.thumbnail_url)
+
+    def test_replaced_image_is_not_overwritten(self):
+        """ Проверка, что устаревшая задача не трогает новую картинку. """
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Тестовый пост')
+        post.image.save('old.gif', ContentFile(SMALL_GIF))
+        post.image.save('new.gif', ContentFile(SMALL_GIF))
+        generate_post_thumbnail(post.id, 'posts/old.gif')
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail, '')
+
+    def test_warm_thumbnails_command(self):
+        """ Проверка, что команда создает миниатюры существующих картинок. """
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Тестовый пост')
+        post.image.save('warm.gif', ContentFile(SMALL_GIF))
+        call_command('warm_thumbnails', '--workers', '1',
+                     stdout=StringIO(), stderr=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail.startswith('cache/'))
+
+    def test_cleanup_removes_orphans_only(self):
+        """ Проверка, что чистка удаляет только ненужные миниатюры. """
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Тестовый пост')
+        post.image.save('kept.gif', ContentFile(SMALL_GIF))
+        generate_post_thumbnail(post.id, post.image.name)
+        post.refresh_from_db()
+        orphan = os.path.join(TEMP_MEDIA_ROOT, 'cache', 'ab', 'orphan.jpg')
+        os.makedirs(os.path.dirname(orphan), exist_ok=True)
+        with open(orphan, 'wb') as file:
+            file.write(b'orphan')
+        call_command('cleanup_thumbnails', stdout=StringIO())
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(
+            os.path.join(TEMP_MEDIA_ROOT, post.thumbnail)))
+
+    def test_variants_are_made_and_rendered(self):
+        """ Проверка, что варианты попадают в srcset шаблона. """
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Тестовый пост')
+        post.image.save('variants.gif', ContentFile(SMALL_GIF))
+        generate_post_thumbnail(post.id, post.image.name)
+        post.refresh_from_db()
+        variants = json.loads(post.thumbnail_variants)
+        # Исходник уже самой узкой ширины: остается только она
+        self.assertEqual([width for width, _ in variants['JPEG']],
+                         [min(settings.POST_IMAGE_VARIANT_WIDTHS)])
+        self.assertEqual(set(variants), set(variant_formats()))
+        response = self.client.get(reverse('posts:post_detail',
+                                           kwargs={'post_id': post.id}))
+        self.assertContains(response, f'srcset="{post.thumbnail_srcset}"')
+
+    @override_settings(POST_IMAGE_VARIANT_WIDTHS=(480, 960, 1440))
+    def test_variant_widths_do_not_upscale(self):
+        """ Проверка, что ширины больше исходника пропускаются. """
+        self.assertEqual(variant_widths(1000), [480, 960])
+        self.assertEqual(variant_widths(100), [480])
+        self.assertEqual(variant_widths(None), [480, 960, 1440])
@@ -0,0 +1,177 @@
+import threading
+import time
+from io import StringIO
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post, Follow
+from .. import moderation
+from ..timelines import TIMELINE_KEY, TIMELINE_LOCK_KEY, _update
+
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_TIMELINES=True, FOLLOW_FANOUT_LIMIT=1)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+        cls.author = User.objects.create_user(username='testierboy')
+        cls.popular = User.objects.create_user(username='popularboy')
+        cls.fan = User.objects.create_user(username='fanboy')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Follow.objects.create(user=cls.user, author=cls.popular)
+        Follow.objects.create(user=cls.fan, author=cls.popular)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(TimelineTests.user)
+        self.author_client = Client()
+        self.author_client.force_login(TimelineTests.author)
+
+    def follow_posts(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return response.context['page_obj'].object_list
+
+    def test_new_post_is_fanned_out(self):
+        """ Проверка, что новый пост попадает в готовую ленту. """
+        self.assertEqual(len(self.follow_posts()), 0)
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Тест раздачи'})
+        entries = cache.get(TIMELINE_KEY.format(TimelineTests.user.pk))
+        post = Post.objects.get(text='Тест раздачи')
+        self.assertEqual(entries[0][1], post.pk)
+        self.assertEqual(self.follow_posts(), [post])
+
+    def test_popular_author_is_pulled_on_read(self):
+        """ Проверка, что посты популярного автора подмешиваются. """
+        self.follow_posts()
+        post = Post.objects.create(author=TimelineTests.popular,
+                                   text='Тест популярного автора')
+        entries = cache.get(TIMELINE_KEY.format(TimelineTests.user.pk))
+        self.assertEqual(entries, [])
+        self.assertEqual(self.follow_posts(), [post])
+
+    def test_follow_and_unfollow_update_timeline(self):
+        """ Проверка, что подписка и отписка меняют ленту. """
+        other = User.objects.create_user(username='otherboy')
+        post = Post.objects.create(author=other, text='Тест подписки')
+        self.follow_posts()
+        username_param = {'username': other.username}
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs=username_param))
+        self.assertEqual(self.follow_posts(), [post])
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs=username_param))
+        self.assertEqual(self.follow_posts(), [])
+
+    def test_rebuild_command(self):
+        """ Проверка команды пересборки лент. """
+        post = Post.objects.create(author=TimelineTests.author,
+                                   text='Тест пересборки')
+        call_command('rebuild_timelines', stdout=StringIO())
+        entries = cache.get(TIMELINE_KEY.format(TimelineTests.user.pk))
+        self.assertEqual([entry[1] for entry in entries], [post.pk])
+
+    def test_timelines_skip_local_tier(self):
+        """ Ленты читаются из общего кэша, а не из копии процесса. """
+        key = TIMELINE_KEY.format(TimelineTests.user.pk)
+        cache.set(key, [])
+        caches['default'].shared.delete(key)
+        self.assertIsNone(cache.get(key))
+
+    def test_parallel_updates_keep_entries(self):
+        """ Параллельные изменения ленты не затирают друг друга. """
+        user_id = TimelineTests.user.pk
+        cache.set(TIMELINE_KEY.format(user_id), [])
+
+        def change(entries, entry):
+            time.sleep(0.01)
+            return entries + [entry]
+
+        threads = [
+            threading.Thread(target=_update, args=(
+                user_id, lambda entries, i=i: change(entries, [0, i, 0])))
+            for i in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        entries = cache.get(TIMELINE_KEY.format(user_id))
+        self.assertEqual(sorted(entry[1] for entry in entries),
+                         list(range(5)))
+
+    @override_settings(FOLLOW_TIMELINE_LOCK_TIMEOUT=0.05)
+    def test_stuck_lock_drops_timeline(self):
+        """ Без блокировки лента сбрасывается и соберется при чтении. """
+        user_id = TimelineTests.user.pk
+        cache.set(TIMELINE_KEY.format(user_id), [])
+        cache.set(TIMELINE_LOCK_KEY.format(user_id), 1)
+        _update(user_id, lambda entries: entries + [[0, 1, 0]])
+        self.assertIsNone(cache.get(TIMELINE_KEY.format(user_id)))
+
+    @override_settings(FEED_PAGINATION='cursor')
+    def test_cursor_pagination(self):
+        """ Лента из кэша листается курсорами вперед и назад. """
+        Post.objects.bulk_create(
+            Post(author=TimelineTests.author, text=f'Пост {i}')
+            for i in range(12))
+        url = reverse('posts:follow_index')
+        first = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first), 10)
+        self.assertFalse(first.has_previous())
+        second = self.client.get(
+            url, {'after': first.next_cursor}).context['page_obj']
+        self.assertEqual(len(second), 2)
+        self.assertFalse(second.has_next())
+        back = self.client.get(
+            url, {'before': second.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    @override_settings(FEED_PAGINATION='cursor')
+    def test_cursor_before_head(self):
+        """ ?before= самого нового поста отдает первую страницу. """
+        Post.objects.create(author=TimelineTests.author, text='Пост')
+        first = self.client.get(
+            reverse('posts:follow_index')).context['page_obj']
+        response = self.client.get(reverse('posts:follow_index'), {
+            'before': first.paginator.encode_cursor(first[0])})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), list(first))
+
+    def test_model_changes_update_timeline(self):
+        """ Подписки и посты вне представлений тоже меняют ленту. """
+        other = User.objects.create_user(username='otherboy')
+        post = Post.objects.create(author=other, text='Тест сигналов')
+        self.follow_posts()
+        follow = Follow.objects.create(user=TimelineTests.user,
+                                       author=other)
+        self.assertEqual(self.follow_posts(), [post])
+        post.delete()
+        entries = cache.get(TIMELINE_KEY.format(TimelineTests.user.pk))
+        self.assertEqual(entries, [])
+        post = Post.objects.create(author=other, text='Тест отписки')
+        follow.delete()
+        self.assertEqual(self.follow_posts(), [])
+
+    def test_author_below_limit_is_pushed(self):
+        """ Посты автора, у которого стало мало подписчиков, раздаются. """
+        post = Post.objects.create(author=TimelineTests.popular,
+                                   text='Тест популярного автора')
+        self.follow_posts()
+        Follow.objects.filter(user=TimelineTests.fan).delete()
+        entries = cache.get(TIMELINE_KEY.format(TimelineTests.user.pk))
+        self.assertEqual([entry[1] for entry in entries], [post.pk])
+
+    def test_purge_drops_timelines(self):
+        """ Массовое удаление подписок сбрасывает ленты подписчиков. """
+        self.follow_posts()
+        moderation.purge_authors([TimelineTests.author.pk])
+        self.assertIsNone(
+            cache.get(TIMELINE_KEY.format(TimelineTests.user.pk)))
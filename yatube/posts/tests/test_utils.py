@@ -0,0 +1,128 @@
+from django.template.loader import render_to_string
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from ..models import Post, Group
+from ..utils import CursorPage, CursorPaginator
+
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testboy')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        # bulk_create дает постам почти одинаковый pub_date,
+        # порядок должен держаться на pk
+        posts = (Post(text=f'Тестовый пост {i}',
+                      group=cls.group,
+                      author=cls.user) for i in range(23))
+        Post.objects.bulk_create(posts)
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def test_pages_cover_all_posts_once(self):
+        """ Проверка, что страницы по after не теряют и не дублируют посты. """
+        seen = []
+        page = self.paginator.get_cursor_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            page = self.paginator.get_cursor_page(after=page.next_cursor)
+        expected = list(Post.objects.order_by('-pub_date', '-pk')
+                        .values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(page), 3)
+
+    def test_before_returns_previous_page(self):
+        """ Проверка, что before возвращает предыдущую страницу. """
+        first = self.paginator.get_cursor_page()
+        second = self.paginator.get_cursor_page(after=first.next_cursor)
+        back = self.paginator.get_cursor_page(before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_cursor_page_does_not_count(self):
+        """ Проверка, что курсорная страница не делает COUNT(*). """
+        first = self.paginator.get_cursor_page()
+        with self.assertNumQueries(1):
+            self.paginator.get_cursor_page(after=first.next_cursor)
+
+    def test_broken_cursor_returns_first_page(self):
+        """ Проверка, что битый токен отдает первую страницу. """
+        first = self.paginator.get_cursor_page()
+        broken = self.paginator.get_cursor_page(after='not-a-cursor')
+        self.assertEqual(list(broken), list(first))
+
+    def test_before_head_returns_first_page(self):
+        """ Проверка, что before самого нового поста дает первую страницу. """
+        first = self.paginator.get_cursor_page()
+        head = self.paginator.encode_cursor(first[0])
+        page = self.paginator.get_cursor_page(before=head)
+        self.assertEqual(list(page), list(first))
+        self.assertFalse(page.has_previous())
+        self.assertEqual(page.next_cursor, first.next_cursor)
+
+    @override_settings(FEED_PAGINATION='cursor')
+    def test_feed_before_head(self):
+        """ Проверка, что ?before= у начала ленты не дает ошибку. """
+        first = self.paginator.get_cursor_page()
+        response = Client().get(reverse('posts:index'), {
+            'before': self.paginator.encode_cursor(first[0])})
+        self.assertEqual(response.status_code, 200)
+
+    def test_empty_page_has_no_cursors(self):
+        """ Проверка, что у пустой страницы курсоров нет. """
+        page = CursorPage([], self.paginator, True, True)
+        self.assertIsNone(page.next_cursor)
+        self.assertIsNone(page.previous_cursor)
+
+    def test_page_numbers_are_none(self):
+        """ Номера страниц Page у курсорной страницы — None, не ошибка. """
+        page = self.paginator.get_cursor_page()
+        for method in (page.next_page_number, page.previous_page_number,
+                       page.start_index, page.end_index):
+            with self.subTest(method=method.__name__):
+                self.assertIsNone(method())
+
+    def test_cursor_links_keep_query(self):
+        """ Ссылки курсоров сохраняют остальные параметры запроса. """
+        first = self.paginator.get_cursor_page()
+        second = self.paginator.get_cursor_page(after=first.next_cursor)
+        html = render_to_string('posts/includes/paginator.html',
+                                {'page_obj': second, 'page_query': 'q=a&'})
+        self.assertIn(f'?q=a&amp;after={second.next_cursor}', html)
+        self.assertIn(f'?q=a&amp;before={second.previous_cursor}', html)
+
+    @override_settings(FEED_PAGINATION='cursor')
+    def test_views_use_cursor_pagination(self):
+        """ Проверка, что ленты переходят на курсоры по настройке. """
+        client = Client()
+        addresses = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': CursorPaginatorTests.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': CursorPaginatorTests.user.username})
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                response = client.get(address)
+                page_obj = response.context['page_obj']
+                self.assertTrue(page_obj.is_cursor)
+                self.assertContains(response,
+                                    f'?after={page_obj.next_cursor}')
+                response = client.get(
+                    f'{address}?after={page_obj.next_cursor}')
+                self.assertEqual(len(response.context['page_obj']), 10)
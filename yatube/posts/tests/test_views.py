@@ -1,7 +1,6 @@
 import tempfile
 import shutil
 from django.core.cache import cache
-from django.core.cache.utils import make_template_fragment_key
 from django.conf import settings
 from django.test import TestCase, Client, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -57,6 +56,7 @@ class PostsViewTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.client.force_login(PostsViewTests.user)
 
@@ -216,22 +216,71 @@ class PostsViewTests(TestCase):
 
     def test_index_is_cached(self):
         """ Проверка, что индекс кэшируется. """
-        key = make_template_fragment_key('index_page')
-        first_cache_post = Post.objects.create(
+        cached_post = Post.objects.create(
             author=PostsViewTests.user,
             group=PostsViewTests.group,
             text='Тест кэша 1'
         )
         first_response = self.client.get(reverse('posts:index'))
-        post_exists = first_response.content
-        first_cache_post.delete()
+        # update() не шлет сигналов, поэтому фрагмент остается в кэше
+        Post.objects.filter(pk=cached_post.pk).update(text='Тест кэша 2')
         second_response = self.client.get(reverse('posts:index'))
-        post_in_cache = second_response.content
-        self.assertEqual(post_exists, post_in_cache)
-        cache.delete(key)
+        self.assertEqual(first_response.content, second_response.content)
+        cache.clear()
         final_response = self.client.get(reverse('posts:index'))
-        posts_in_final = final_response.content
-        self.assertNotEqual(post_exists, posts_in_final)
+        self.assertContains(final_response, 'Тест кэша 2')
+
+    def test_feed_cache_is_invalidated_by_post_changes(self):
+        """ Проверка, что изменения постов сбрасывают кэш лент. """
+        paths = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': PostsViewTests.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': PostsViewTests.user.username})
+        ]
+        for path in paths:
+            self.client.get(path)
+        new_post = Post.objects.create(
+            author=PostsViewTests.user,
+            group=PostsViewTests.group,
+            text='Тест сброса кэша'
+        )
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertContains(self.client.get(path), 'Тест сброса кэша')
+        new_post.delete()
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertNotContains(self.client.get(path),
+                                       'Тест сброса кэша')
+
+    def test_feed_cache_depends_on_page(self):
+        """ Проверка, что разные страницы не делят один фрагмент. """
+        posts = (Post(text=f'Тестовый пост {i}',
+                      group=PostsViewTests.group,
+                      author=PostsViewTests.user) for i in range(12))
+        Post.objects.bulk_create(posts)
+        cache.clear()
+        first_page = self.client.get(reverse('posts:index'))
+        second_page = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first_page.context['feed_cache_key'],
+                            second_page.context['feed_cache_key'])
+        self.assertContains(second_page, 'Тестовый пост 0')
+
+    def test_group_edit_invalidates_old_group_feed(self):
+        """ Проверка, что перенос поста сбрасывает ленту старой группы. """
+        group_path = reverse('posts:group_list',
+                             kwargs={'slug': PostsViewTests.group.slug})
+        moved_post = Post.objects.create(
+            author=PostsViewTests.user,
+            group=PostsViewTests.group,
+            text='Тест переноса'
+        )
+        self.assertContains(self.client.get(group_path), 'Тест переноса')
+        moved_post.group = None
+        moved_post.save()
+        self.assertNotContains(self.client.get(group_path), 'Тест переноса')
 
     def test_logged_user_can_follow_author(self):
         """ Проверка, что пользователь может подписываться на автора. """
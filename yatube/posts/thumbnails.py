@@ -0,0 +1,157 @@
+"""
+Предварительная генерация миниатюр картинок постов.
+
+Миниатюра и ее варианты разной ширины (в том числе WebP) создаются
+фоновым пулом потоков после сохранения картинки, а их имена
+записываются в Post.thumbnail и Post.thumbnail_variants. Шаблоны
+только читают готовые адреса и не вызывают Pillow во время запроса.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from .caching import bump_post_feeds
+from .images import supported_formats
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def wait_for_thumbnails():
+    """
+    Дожидается задач пула, например до удаления временного
+    MEDIA_ROOT в тестах. Следующая задача создаст новый пул.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _make(image_name, geometry, **options):
+    try:
+        thumbnail = get_thumbnail(image_name, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', image_name)
+        return None
+    # sorl не бросает исключение, если исходника нет
+    if not thumbnail.exists():
+        return None
+    return thumbnail.name
+
+
+def make_thumbnail(image_name):
+    """ Создает миниатюру картинки и возвращает ее имя или None. """
+    return _make(image_name, settings.POST_THUMBNAIL_GEOMETRY,
+                 **settings.POST_THUMBNAIL_OPTIONS)
+
+
+def variant_formats():
+    """ Форматы вариантов, которые умеет сохранять Pillow. """
+    return supported_formats(settings.POST_IMAGE_VARIANT_FORMATS)
+
+
+def variant_widths(source_width):
+    """
+    Ширины вариантов без увеличения картинки:
+    самая узкая остается, даже если исходник еще уже.
+    """
+    widths = sorted(settings.POST_IMAGE_VARIANT_WIDTHS)
+    return [
+        width for width in widths
+        if width == widths[0] or source_width is None
+        or width <= source_width
+    ]
+
+
+def make_variants(image_name):
+    """
+    Варианты картинки разной ширины во всех форматах
+    с пропорциями основной миниатюры:
+    {'JPEG': [[480, 'cache/..'], ...], 'WEBP': [...]}.
+    """
+    base_width, base_height = map(
+        int, settings.POST_THUMBNAIL_GEOMETRY.split('x'))
+    try:
+        with default_storage.open(image_name) as image:
+            source_width = get_image_dimensions(image)[0]
+    except OSError:
+        return {}
+    variants = {}
+    for image_format in variant_formats():
+        for width in variant_widths(source_width):
+            height = round(width * base_height / base_width)
+            name = _make(image_name, f'{width}x{height}',
+                         **{**settings.POST_THUMBNAIL_OPTIONS,
+                            'format': image_format})
+            if name is not None:
+                variants.setdefault(image_format, []).append([width, name])
+    return variants
+
+
+def make_post_images(image_name):
+    """ Основная миниатюра и JSON вариантов для полей поста. """
+    thumbnail = make_thumbnail(image_name)
+    if thumbnail is None:
+        return None, ''
+    return thumbnail, json.dumps(make_variants(image_name))
+
+
+def generate_post_thumbnail(post_id, image_name):
+    """
+    Создает миниатюры и сохраняет их имена в посте,
+    если картинку поста еще не успели заменить.
+    """
+    thumbnail, variants = make_post_images(image_name)
+    if thumbnail is None:
+        return None
+    updated = (Post.objects
+               .filter(pk=post_id, image=image_name)
+               .update(thumbnail=thumbnail, thumbnail_variants=variants))
+    if updated:
+        bump_post_feeds(Post.objects.get(pk=post_id))
+    return thumbnail
+
+
+def _generate_in_worker(post_id, image_name):
+    try:
+        generate_post_thumbnail(post_id, image_name)
+    finally:
+        # Соединения с базой у каждого потока свои
+        connections.close_all()
+
+
+def schedule_post_thumbnail(post):
+    """
+    Ставит генерацию миниатюры в очередь после коммита транзакции.
+    При THUMBNAIL_ASYNC = False миниатюра создается сразу.
+    """
+    if not post.image:
+        return
+    post_id, image_name = post.pk, post.image.name
+    if not settings.THUMBNAIL_ASYNC:
+        generate_post_thumbnail(post_id, image_name)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_generate_in_worker,
+                                      post_id, image_name)
+    )
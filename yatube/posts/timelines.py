@@ -0,0 +1,248 @@
+"""
+Материализованные ленты подписок (fan-out on write).
+
+Лента пользователя хранится в кэше как ограниченный список
+[timestamp, post_id, author_id], отсортированный от новых к старым.
+Новый пост раздается в ленты подписчиков в момент создания.
+Посты авторов, у которых больше FOLLOW_FANOUT_LIMIT подписчиков,
+не раздаются, а подмешиваются при чтении ленты.
+Ленты меняются под блокировкой в общем кэше, поэтому ключи timeline:
+должны читаться только из него (LOCAL_SKIP в core.cache.TieredCache).
+Ленты обновляют сигналы Post и Follow (posts.signals), поэтому
+их видят и админка, и удаление пользователей. Массовые операции
+без сигналов (импорт, модерация) сбрасывают ленты целиком.
+"""
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from .models import Follow, Post, UserCounters
+from .utils import CursorPage, CursorPaginator
+
+
+TIMELINE_KEY = 'timeline:{}'
+
+TIMELINE_LOCK_KEY = 'timeline:lock:{}'
+
+LOCK_POLL_INTERVAL = 0.01
+
+
+def timelines_enabled():
+    return settings.FOLLOW_TIMELINES
+
+
+def _entry(post):
+    return [post.pub_date.timestamp(), post.pk, post.author_id]
+
+
+def _merge(*entry_lists):
+    """ Слияние записей без дублей, от новых к старым, с обрезкой. """
+    merged = {}
+    for entries in entry_lists:
+        for entry in entries:
+            merged[entry[1]] = entry
+    entries = sorted(merged.values(), key=lambda e: (e[0], e[1]),
+                     reverse=True)
+    return entries[:settings.FOLLOW_TIMELINE_SIZE]
+
+
+def _recent_entries(authors):
+    posts = (Post.objects
+             .filter(author__in=authors)
+             .order_by('-pub_date', '-pk')
+             .only('pk', 'pub_date', 'author_id')
+             [:settings.FOLLOW_TIMELINE_SIZE])
+    return [_entry(post) for post in posts]
+
+
+def _crowded_authors(authors):
+    """
+    Авторы из authors, чьи посты подмешиваются при чтении.
+    Число подписчиков берется из денормализованных счетчиков,
+    чтобы чтение ленты не считало подписки через GROUP BY.
+    """
+    return set(UserCounters.objects
+               .filter(user__in=authors,
+                       followers_count__gt=settings.FOLLOW_FANOUT_LIMIT)
+               .values_list('user', flat=True))
+
+
+def _save(user_id, entries):
+    cache.set(TIMELINE_KEY.format(user_id), entries, None)
+
+
+@contextmanager
+def _timeline_lock(user_id):
+    """
+    Блокировка ленты в общем кэше на время чтения и записи:
+    без нее параллельные раздачи и подписки затирают записи
+    друг друга. Отдает False, если блокировку взять не удалось.
+    """
+    key = TIMELINE_LOCK_KEY.format(user_id)
+    timeout = settings.FOLLOW_TIMELINE_LOCK_TIMEOUT
+    deadline = time.monotonic() + timeout
+    while not cache.add(key, 1, timeout):
+        if time.monotonic() >= deadline:
+            yield False
+            return
+        time.sleep(LOCK_POLL_INTERVAL)
+    try:
+        yield True
+    finally:
+        cache.delete(key)
+
+
+def _update(user_id, change):
+    """
+    Заменяет ленту на change(entries) под блокировкой.
+    Лент, которых нет в кэше, не создает. Если блокировку
+    не удалось взять, лента удаляется и соберется при чтении.
+    """
+    key = TIMELINE_KEY.format(user_id)
+    with _timeline_lock(user_id) as locked:
+        if not locked:
+            cache.delete(key)
+            return
+        entries = cache.get(key)
+        if entries is not None:
+            _save(user_id, change(entries))
+
+
+def rebuild_timeline(user):
+    """ Собирает ленту пользователя заново из базы. """
+    with _timeline_lock(user.pk) as locked:
+        authors = set(user.follower.values_list('author', flat=True))
+        pushed = authors - _crowded_authors(authors)
+        entries = _recent_entries(pushed) if pushed else []
+        if locked:
+            _save(user.pk, entries)
+    return entries
+
+
+def _follower_timelines(author_id):
+    """ id подписчиков автора, чьи ленты есть в кэше. """
+    followers = (Follow.objects
+                 .filter(author_id=author_id)
+                 .values_list('user', flat=True))
+    keys = {TIMELINE_KEY.format(user_id): user_id for user_id in followers}
+    return [keys[key] for key in cache.get_many(keys)]
+
+
+def fan_out_post(post):
+    """
+    Раздает новый пост в ленты подписчиков автора.
+    Ленты, которых нет в кэше, не создаются: они соберутся при чтении.
+    """
+    if _crowded_authors([post.author_id]):
+        return
+    entry = _entry(post)
+    for user_id in _follower_timelines(post.author_id):
+        _update(user_id, lambda entries: _merge([entry], entries))
+
+
+def remove_post(post):
+    """
+    Убирает удаленный пост из лент подписчиков. Посты авторов
+    с большим числом подписчиков при чтении и так пропускаются.
+    """
+    if _crowded_authors([post.author_id]):
+        return
+    for user_id in _follower_timelines(post.author_id):
+        _update(user_id, lambda entries: [
+            entry for entry in entries if entry[1] != post.pk
+        ])
+
+
+def add_author(user_id, author_id):
+    """ Подмешивает посты нового автора в ленту после подписки. """
+    if (cache.get(TIMELINE_KEY.format(user_id)) is None
+            or _crowded_authors([author_id])):
+        return
+    recent = _recent_entries([author_id])
+    _update(user_id, lambda entries: _merge(entries, recent))
+
+
+def remove_author(user_id, author_id):
+    """ Убирает посты автора из ленты после отписки. """
+    _update(user_id, lambda entries: [
+        entry for entry in entries if entry[2] != author_id
+    ])
+
+
+def push_author(author_id):
+    """
+    Раздает недавние посты автора всем подписчикам, когда он
+    перестает подмешиваться при чтении (подписчиков стало
+    FOLLOW_FANOUT_LIMIT): его новые посты в ленты не раздавались.
+    """
+    recent = None
+    for user_id in _follower_timelines(author_id):
+        if recent is None:
+            recent = _recent_entries([author_id])
+        _update(user_id, lambda entries: _merge(entries, recent))
+
+
+def drop_timelines(user_ids):
+    """ Удаляет ленты из кэша: они соберутся заново при чтении. """
+    cache.delete_many([TIMELINE_KEY.format(user_id) for user_id in user_ids])
+
+
+def _load_posts(post_ids):
+    """ Посты страницы в порядке post_ids, без удаленных. """
+    posts = Post.objects.for_feed().in_bulk(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+def _cursor_page(request, entries):
+    """
+    Курсорная страница по записям ленты. Токены те же,
+    что у CursorPaginator ленты постов: (pub_date, pk).
+    """
+    per_page = settings.NUM_OBJECTS_TO_DISPLAY
+    paginator = CursorPaginator(Post.objects.all(), per_page)
+    # Ключи по возрастанию для bisect
+    keys = [(-entry[0], -entry[1]) for entry in entries]
+    after = request.GET.get('after')
+    after = after and paginator.decode_cursor(after)
+    before = request.GET.get('before')
+    before = before and paginator.decode_cursor(before)
+    end = 0
+    if before and not after:
+        end = bisect_left(keys, (-before[0].timestamp(), -before[1]))
+    if end:
+        start = max(end - per_page, 0)
+        has_previous = start > 0
+    else:
+        # Перед before записей нет: первая страница, как у CursorPaginator
+        start = 0
+        if after:
+            start = bisect_right(keys, (-after[0].timestamp(), -after[1]))
+        end = start + per_page
+        has_previous = bool(after)
+    has_next = end < len(entries)
+    posts = _load_posts([entry[1] for entry in entries[start:end]])
+    return CursorPage(posts, paginator, has_next, has_previous)
+
+
+def timeline_page(request, user):
+    """
+    Страница ленты подписок из материализованного списка.
+    Из базы загружаются только посты текущей страницы.
+    """
+    entries = cache.get(TIMELINE_KEY.format(user.pk))
+    if entries is None:
+        entries = rebuild_timeline(user)
+    crowded = _crowded_authors(user.follower.values('author'))
+    if crowded:
+        entries = _merge(entries, _recent_entries(crowded))
+    if settings.FEED_PAGINATION == 'cursor':
+        return _cursor_page(request, entries)
+    post_ids = [entry[1] for entry in entries]
+    paginator = Paginator(post_ids, settings.NUM_OBJECTS_TO_DISPLAY)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = _load_posts(page_obj.object_list)
+    return page_obj
@@ -1,13 +1,202 @@
-from django.core.paginator import Paginator
-from yatube.settings import NUM_OBJECTS_TO_DISPLAY
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import Comment
+
+
+FEED_ORDERING = ('-pub_date', '-pk')
+
+COMMENT_ORDERING = ('-created', '-pk')
+
+
+class CursorPage(Page):
+    """
+    Страница курсорного паджинатора.
+    Знает только о соседних страницах и не считает общее
+    количество объектов, поэтому номера страниц и объектов
+    API Page здесь None; ссылки строятся по next_cursor
+    и previous_cursor.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of %s objects>' % len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+    def next_page_number(self):
+        return None
+
+    def previous_page_number(self):
+        return None
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """
+    Паджинатор по ключу (keyset pagination).
+    Вместо COUNT(*) и OFFSET фильтрует выборку по значениям
+    полей сортировки последнего показанного объекта,
+    поэтому глубокие страницы не становятся медленнее.
+    Все поля ordering должны сортироваться в одном направлении,
+    последнее поле должно быть уникальным.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.descending = ordering[0].startswith('-')
+        self.field_names = [name.lstrip('-') for name in ordering]
+        opts = object_list.model._meta
+        self.fields = [
+            opts.pk if name == 'pk' else opts.get_field(name)
+            for name in self.field_names
+        ]
+
+    def encode_cursor(self, obj):
+        """ Токен с ключом сортировки объекта. """
+        values = [field.value_to_string(obj) for field in self.fields]
+        return urlsafe_base64_encode(force_bytes(json.dumps(values)))
+
+    def decode_cursor(self, cursor):
+        """ Значения ключа из токена или None, если токен битый. """
+        try:
+            values = json.loads(urlsafe_base64_decode(cursor))
+            if len(values) != len(self.fields):
+                return None
+            values = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return values
+
+    def _seek(self, values, forward):
+        """ Условие 'строго после ключа' в порядке сортировки. """
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for i, name in enumerate(self.field_names):
+            equal = {
+                self.field_names[j]: values[j] for j in range(i)
+            }
+            equal[f'{name}__{lookup}'] = values[i]
+            condition |= Q(**equal)
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def get_cursor_page(self, after=None, before=None):
+        """
+        Страница после токена after или перед токеном before.
+        Без токенов (или с битым токеном) возвращается первая страница,
+        как и по before, перед которым объектов нет.
+        """
+        after = after and self.decode_cursor(after)
+        before = before and self.decode_cursor(before)
+        if before and not after:
+            queryset = (self.object_list
+                        .filter(self._seek(before, forward=False))
+                        .order_by(*self._reversed_ordering()))
+            objects = list(queryset[:self.per_page + 1])
+            if objects:
+                has_previous = len(objects) > self.per_page
+                objects = objects[:self.per_page][::-1]
+                # Следующая страница начинается с объекта before
+                return CursorPage(objects, self, True, has_previous)
+        queryset = self.object_list.order_by(*self.ordering)
+        if after:
+            queryset = queryset.filter(self._seek(after, forward=True))
+        objects = list(queryset[:self.per_page + 1])
+        has_next = len(objects) > self.per_page
+        return CursorPage(objects[:self.per_page], self, has_next,
+                          bool(after))
+
+
+def objects_to_cursor_paginator(request, objects, ordering=FEED_ORDERING):
+    """
+    Курсорный аналог objects_to_paginator: страницы
+    выбираются параметрами ?after= и ?before= без подсчета объектов.
+    """
+    paginator = CursorPaginator(objects, settings.NUM_OBJECTS_TO_DISPLAY,
+                                ordering)
+    return paginator.get_cursor_page(request.GET.get('after'),
+                                     request.GET.get('before'))
+
+
+def get_request_object(request, queryset, **lookup):
+    """
+    get_object_or_404, запомненный на время запроса:
+    валидатор ETag и представление получают объект одним запросом.
+    """
+    objects = request.__dict__.setdefault('_request_objects', {})
+    key = (queryset.model, tuple(sorted(lookup.items())))
+    if key not in objects:
+        objects[key] = get_object_or_404(queryset, **lookup)
+    return objects[key]
+
+
+def comments_page(post_id, after=None):
+    """
+    Страница комментариев поста от новых к старым после курсора after.
+    Авторы загружаются тем же запросом.
+    """
+    comments = (Comment.objects.filter(post_id=post_id)
+                .select_related('author'))
+    paginator = CursorPaginator(comments, settings.COMMENTS_PER_PAGE,
+                                COMMENT_ORDERING)
+    return paginator.get_cursor_page(after)
 
 
 def objects_to_paginator(request, objects):
     """
     Перевод списка объектов в паджинатор
     с выводом 10 объектов на страницу.
+    При FEED_PAGINATION = 'cursor' используется курсорный паджинатор.
     """
-    paginator = Paginator(objects, NUM_OBJECTS_TO_DISPLAY)
+    if settings.FEED_PAGINATION == 'cursor':
+        return objects_to_cursor_paginator(request, objects)
+    paginator = Paginator(objects, settings.NUM_OBJECTS_TO_DISPLAY)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
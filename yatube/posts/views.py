@@ -1,62 +1,145 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import (Http404, HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, render, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from core.db import read_only_view
 from .models import Follow, Post, Group
 from .forms import PostForm, CommentForm
-from .utils import objects_to_paginator
+from .utils import comments_page, get_request_object, objects_to_paginator
+from .caching import (INDEX_SCOPES, feed_cache_context, feed_page,
+                      follow_scopes, group_scopes, post_scopes,
+                      profile_scopes)
+from . import timelines
+from .counters import get_user_counters
+from .thumbnails import schedule_post_thumbnail
+from .search import search_post_ids
+from .export import DATASETS, FORMATS, export_lines, parse_watermark
 
 
 User = get_user_model()
 
 
+def index_scopes(request):
+    return INDEX_SCOPES
+
+
+def group_page_scopes(request, slug):
+    group = get_request_object(request, Group.objects.all(), slug=slug)
+    return group_scopes(group)
+
+
+def profile_page_scopes(request, username):
+    author = get_request_object(request,
+                                User.objects.select_related('counters'),
+                                username=username)
+    return profile_scopes(author) + follow_scopes(author.pk)
+
+
+def post_page_scopes(request, post_id):
+    post = get_request_object(request, Post.objects.for_detail(), pk=post_id)
+    return post_scopes(post)
+
+
+def profile_reader_context(request, username):
+    """ Переменные кнопки подписки для читателя. """
+    if not request.user.is_authenticated:
+        return {'following': False}
+    author = get_request_object(request,
+                                User.objects.select_related('counters'),
+                                username=username)
+    return {'following': request.user.follower.filter(
+        author=author).exists()}
+
+
+def post_reader_context(request, post_id):
+    """ Переменные формы комментария для читателя. """
+    return {'form': CommentForm()}
+
+
+@read_only_view
+@feed_page(index_scopes)
 def index(request):
     """ Главная страница. """
-    posts = (Post.objects
-             .select_related('author', 'group'))
+    posts = Post.objects.for_feed()
     page_obj = objects_to_paginator(request, posts)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        **feed_cache_context(request, page_obj, INDEX_SCOPES)
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_only_view
+def search(request):
+    """ Поиск постов по словам из текста. """
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search_post_ids(query),
+                          settings.NUM_OBJECTS_TO_DISPLAY)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@read_only_view
+@feed_page(group_page_scopes)
 def group_posts(request, slug):
     """ Все посты группы. """
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_request_object(request, Group.objects.all(), slug=slug)
+    posts = group.posts.for_feed()
     page_obj = objects_to_paginator(request, posts)
     context = {
         'group': group,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        **feed_cache_context(request, page_obj, group_scopes(group))
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@read_only_view
+@feed_page(profile_page_scopes, profile_reader_context)
 def profile(request, username):
     """ Профиль пользователя. """
-    user = get_object_or_404(User, username=username)
-    """ Проверка, что пользователь подписан на автора"""
-    following = (request.user.is_authenticated
-                 and request.user.follower.filter(author__exact=user)
-                 )
-    posts = user.posts.all()
+    user = get_request_object(request,
+                              User.objects.select_related('counters'),
+                              username=username)
+    counters = get_user_counters(user)
+    posts = user.posts.for_feed()
     page_obj = objects_to_paginator(request, posts)
 
     context = {
         'page_obj': page_obj,
         'author': user,
-        'following': following
+        'counters': counters,
+        **profile_reader_context(request, username),
+        **feed_cache_context(request, page_obj, profile_scopes(user))
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_only_view
+@feed_page(post_page_scopes, post_reader_context)
 def post_detail(request, post_id):
     """ Подробная информация о посте. """
-    post = get_object_or_404(Post, pk=post_id)
-    user = get_object_or_404(User, username=post.author)
+    post = get_request_object(request, Post.objects.for_detail(),
+                              pk=post_id)
     form = CommentForm()
-    comments = post.comments.all()
-    num_posts = user.posts.count()
+    comments = comments_page(post.pk, request.GET.get('after'))
+    num_posts = get_user_counters(post.author).posts_count
     post_name = post.text[0:30]
     context = {
         'post': post,
@@ -68,6 +151,34 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@read_only_view
+def post_comments(request, post_id):
+    """
+    Следующая страница комментариев поста: фрагмент HTML
+    или JSON при ?format=json.
+    """
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(post.pk, request.GET.get('after'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     """ Создание поста. """
@@ -77,6 +188,7 @@ def post_create(request):
         post_object = form.save(commit=False)
         post_object.author = user
         post_object.save()
+        schedule_post_thumbnail(post_object)
         return redirect('posts:profile', user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -92,7 +204,17 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=post)
     if form.is_valid():
-        form.save()
+        # Сохраняем только поля формы, чтобы не затереть счетчики,
+        # обновленные другими запросами
+        post = form.save(commit=False)
+        update_fields = PostForm.Meta.fields
+        if 'image' in form.changed_data:
+            post.thumbnail = post.thumbnail_variants = ''
+            update_fields = [*update_fields, 'original_image',
+                             'thumbnail', 'thumbnail_variants']
+        post.save(update_fields=update_fields)
+        if 'image' in form.changed_data:
+            schedule_post_thumbnail(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'is_edit': True,
@@ -116,12 +238,16 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_only_view
 def follow_index(request):
     """ Все посты авторов, на которых подписан пользователь. """
     follower = request.user
-    posts = (Post.objects.filter(author__following__user=follower).
-             select_related('author', 'group'))
-    page_obj = objects_to_paginator(request, posts)
+    if timelines.timelines_enabled():
+        page_obj = timelines.timeline_page(request, follower)
+    else:
+        posts = (Post.objects.for_feed()
+                 .filter(author__following__user=follower))
+        page_obj = objects_to_paginator(request, posts)
     context = {
         'page_obj': page_obj
     }
@@ -148,3 +274,24 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(author=author, user=follower).delete()
     return redirect('posts:profile', username)
+
+
+@staff_member_required
+def export(request, dataset):
+    """ Потоковая выгрузка набора данных для сотрудников. """
+    if dataset not in DATASETS:
+        raise Http404
+    output_format = request.GET.get('format', 'ndjson')
+    if output_format not in FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат')
+    since = request.GET.get('since')
+    try:
+        lines = export_lines(dataset, output_format,
+                             parse_watermark(since) if since else None)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(lines,
+                                     content_type=FORMATS[output_format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{dataset}.{output_format}"')
+    return response
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,11 +46,20 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# Разобранные шаблоны хранятся в памяти процесса (cached.Loader)
+# и разбираются при старте (yatube/wsgi.py). Без DEBUG включено всегда,
+# с DEBUG — переменной окружения YATUBE_TEMPLATE_CACHE=1
+TEMPLATE_CACHE = not DEBUG or os.environ.get('YATUBE_TEMPLATE_CACHE') == '1'
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -58,6 +68,10 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
             ],
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
         },
     },
 ]
@@ -68,7 +82,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Соединение переживает запрос: PRAGMA не выполняются каждый раз
+        'CONN_MAX_AGE': 60,
+    },
+    # Тот же файл, соединение только для чтения (core.db)
+    'read': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.db.ReadConnectionRouter']
+
+# Соединение для чтений read_only_view. None — все идет в default
+DATABASE_READ_ALIAS = 'read'
+
+# PRAGMA каждого нового соединения SQLite. cache_size со знаком минус —
+# в КиБ, busy_timeout — в мс
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 2**20,
+    'cache_size': -64 * 2**10,
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -114,8 +152,163 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий для процессов кэш (L2) выбирается переменными окружения
+# YATUBE_CACHE (locmem, file, sqlite или redis) и YATUBE_CACHE_LOCATION.
+# Для redis (и совместимых серверов) нужен пакет django-redis
+SHARED_CACHES = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'sqlite': ('core.cache.SQLiteCache',
+               os.path.join(BASE_DIR, 'cache.sqlite3')),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+SHARED_CACHE_NAME = os.environ.get('YATUBE_CACHE', 'locmem')
+SHARED_CACHE_BACKEND, SHARED_CACHE_LOCATION = SHARED_CACHES[
+    SHARED_CACHE_NAME]
+
+# Ленты и страницы сбрасываются сменой версий feed_version:* в L2.
+# locmem у каждого процесса свой, и с несколькими воркерами смену
+# версии видит только один из них. Поэтому с locmem версии, фрагменты
+# и страницы живут 20 секунд (как до версий), а долгие сроки
+# включаются только с общим кэшем (file, sqlite или redis)
+SHARED_CACHE_PER_PROCESS = SHARED_CACHE_NAME == 'locmem'
+
+# Время жизни версий лент; None — пока их не сменит сигнал
+FEED_VERSION_TIMEOUT = 20 if SHARED_CACHE_PER_PROCESS else None
+
+# Перед общим кэшем — LRU в памяти процесса (core.cache.TieredCache).
+# Версии лент и ленты подписок (их меняют все процессы) всегда
+# читаются из общего кэша, страницы и фрагменты
+# пересчитывает один процесс, остальные ждут или берут прежние
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': {
+                'BACKEND': SHARED_CACHE_BACKEND,
+                'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                           SHARED_CACHE_LOCATION),
+                'OPTIONS': {'MAX_ENTRIES': 10000},
+            },
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+            'LOCAL_SKIP': ('feed_version:', 'timeline:'),
+            'SINGLE_FLIGHT': ('template.cache.', 'page:'),
+            'LOCK_TIMEOUT': 5,
+            'EARLY_EXPIRY_BETA': 1.0,
+        },
     }
 }
+
+# 'page' — нумерованные страницы, 'cursor' — курсорная паджинация
+FEED_PAGINATION = 'page'
+
+# Фрагменты лент сбрасываются сигналами, поэтому с общим кэшем
+# TTL может быть долгим (см. SHARED_CACHE_PER_PROCESS)
+FEED_CACHE_TIMEOUT = 20 if SHARED_CACHE_PER_PROCESS else 60 * 60
+
+# Материализованные ленты подписок. Нужен общий для всех
+# процессов кэш, иначе раздача постов видна только одному воркеру
+FOLLOW_TIMELINES = False
+
+FOLLOW_TIMELINE_SIZE = 500
+
+# Сколько ждать блокировку ленты, прежде чем сбросить ее до пересборки
+FOLLOW_TIMELINE_LOCK_TIMEOUT = 5
+
+# Посты авторов с большим числом подписчиков подмешиваются при чтении
+FOLLOW_FANOUT_LIMIT = 1000
+
+# Миниатюры картинок постов создаются фоновым пулом потоков
+POST_THUMBNAIL_GEOMETRY = '960x339'
+
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+THUMBNAIL_ASYNC = True
+
+THUMBNAIL_WORKERS = 2
+
+# Метаданные миниатюр в общем для всех процессов файле SQLite
+# с LRU-кэшем в памяти каждого процесса
+THUMBNAIL_KVSTORE = 'core.kvstore.SQLiteKVStore'
+
+THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, 'thumbnail_kvstore.sqlite3')
+
+THUMBNAIL_KVSTORE_LRU_SIZE = 1000
+
+THUMBNAIL_KVSTORE_LRU_TIMEOUT = 5 * 60
+
+# Варианты миниатюр для srcset: ширины в пикселях и форматы.
+# WEBP пропускается, если Pillow собран без его поддержки
+POST_IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+
+POST_IMAGE_VARIANT_FORMATS = ('JPEG', 'WEBP')
+
+# Обработка картинок при загрузке: лимиты проверяются до декодирования,
+# затем картинка уменьшается и пересохраняется без метаданных
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 2 ** 20
+
+POST_IMAGE_MAX_PIXELS = 40_000_000
+
+POST_IMAGE_MAX_SIDE = 2048
+
+# Первый формат, который умеет сохранять Pillow.
+# Картинки с прозрачностью вместо JPEG сохраняются в PNG
+POST_IMAGE_FORMATS = ('WEBP', 'JPEG')
+
+POST_IMAGE_QUALITY = 85
+
+# Хранить ли загруженный файл как есть в media/posts/originals/
+POST_IMAGE_KEEP_ORIGINALS = False
+
+# Поиск: 'fts5' — таблица SQLite FTS5, 'python' — обратный индекс
+# SearchTerm, 'auto' — FTS5, если миграция смогла ее создать.
+# После смены бэкенда нужен rebuild_search
+POST_SEARCH_BACKEND = 'auto'
+
+POST_SEARCH_MAX_RESULTS = 1000
+
+# Начиная с этого числа строк список без фильтров в админке
+# показывает оценку вместо COUNT(*). None — всегда точный подсчет
+ADMIN_COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# Размер пачки массовых действий модерации в админке
+MODERATION_BATCH_SIZE = 500
+
+# Профилирование запросов (core.middleware.ProfilingMiddleware).
+# Server-Timing раскрывает внутренние тайминги, поэтому только в DEBUG
+PROFILING_SERVER_TIMING = DEBUG
+
+# Гистограмма длительностей за окно PROFILING_WINDOW секунд
+PROFILING_WINDOW = 10 * 60
+
+PROFILING_SLOT = 60
+
+# Доля запросов под cProfile; дамп пишется для запросов медленнее
+# PROFILING_SLOW_MS. 0 — выключено
+PROFILING_SAMPLE_RATE = 0
+
+PROFILING_SLOW_MS = 500
+
+PROFILING_DUMP_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Метрики Prometheus на /metrics: файлы процессов в METRICS_DIR
+# складываются при каждом сборе
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+
+METRICS_FLUSH_INTERVAL = 5
+
+# Адреса, которым доступен /metrics. None — всем
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Строк в одной пачке потоковой выгрузки (posts.export)
+EXPORT_CHUNK_SIZE = 2000
+
+# Комментариев на первой странице поста и в каждой догрузке
+COMMENTS_PER_PAGE = 20
+
+# Время жизни страниц целиком в кэше (core.pagecache), 0 — выключен.
+# Ключ страницы включает версии данных, поэтому правки видны сразу
+# (с locmem — в течение FEED_VERSION_TIMEOUT в других процессах)
+PAGE_CACHE_TIMEOUT = 20 if SHARED_CACHE_PER_PROCESS else 60 * 5